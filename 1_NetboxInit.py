@@ -21,6 +21,7 @@ if not is_migrating:
         CustomFieldChoiceSet,
     )
     from django.core.exceptions import ValidationError
+    from django.db import connection
     from django.contrib.contenttypes.models import ContentType
     # from django.utils.text import slugify as django_slugify
     from ipam.models import (
@@ -164,6 +165,17 @@ if not is_migrating:
             else:
                 self.log_info(f"Management interface '{interface_name}' already exists for device type '{device_type.model}'.")
 
+        def create_lag_mh_id_index(self):
+            # Expression index for the LAG lookups by multihome ID (custom_field_data__Iface_mh_id on type='lag'),
+            # which would otherwise scan the custom field data of every interface
+            index_name = "dcim_interface_lag_mh_id_idx"
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} ON {Interface._meta.db_table} "
+                    f"((custom_field_data -> 'Iface_mh_id')) WHERE type = 'lag'"
+                )
+            self.log_success(f"Index '{index_name}' for LAG multihome ID lookups ensured.")
+
         def run(self, data, commit):
 
             # Define device roles to be created
@@ -387,6 +399,15 @@ if not is_migrating:
                 object_type=ContentType.objects.get_for_model(ASN)
             )
 
+            # Device intent hash custom field, used by the fabric import to skip unchanged devices
+            self.create_or_update_custom_field(
+                name='Intent_hash',
+                type='text',
+                label='Intent hash',
+                description='Fingerprint of the YAML intent last applied to the device.',
+                content_types=[ContentType.objects.get_for_model(Device)]
+            )
+
             # Site Overlay ASN custom field
             self.create_or_update_custom_field(
                 name='Overlay_ASN',
@@ -397,3 +418,5 @@ if not is_migrating:
                 content_types=[ContentType.objects.get_for_model(Location)],
                 object_type=ContentType.objects.get_for_model(ASN)
             )
+
+            self.create_lag_mh_id_index()
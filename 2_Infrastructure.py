@@ -15,8 +15,15 @@ if not is_migrating:
     import yaml
     import re
     import random
+    import functools
+    import hashlib
+    import itertools
+    import json
+    import time
+    from collections import Counter, defaultdict, namedtuple
     from extras.scripts import (
         AbortScript,
+        BooleanVar,
         ChoiceVar,
         FileVar,
         IntegerVar,
@@ -27,10 +34,16 @@ if not is_migrating:
         StringVar,
         TextVar,
     )
+    from extras.choices import ObjectChangeActionChoices
     from extras.models import (
         CustomFieldChoiceSet,
+        ObjectChange,
         Tag,
+        TaggedItem,
     )
+    from netbox.context import current_request
+    from netbox.search.backends import search_backend
+    from django.contrib.contenttypes.models import ContentType
     # from django.utils.text import slugify as django_slugify
     from ipam.models import (
         ASN,
@@ -46,47 +59,782 @@ if not is_migrating:
         DeviceType,
         DeviceRole,
         Interface,
+        InterfaceTemplate,
         Location,
         Platform,
         Site,
     )
     # from tenancy.models import Tenant
-    # from netaddr import IPAddress as NIPAddress
+    from netaddr import IPAddress as NIPAddress
     from netaddr import IPNetwork
     from contextlib import suppress
+    from django.db import models
 
 
     # From: https://github.com/netbox-community/netbox/discussions/12315#discussioncomment-5685891
-    def slugify(model, name, chars=50):
-        base = str(name)
-        base = re.sub(r'[^-.\w\s]', '', base)        # Remove unneeded chars
-        base = re.sub(r'^[\s.]+|[\s.]+$', '', base)  # Trim leading/trailing spaces
-        base = re.sub(r'[-.\s]+', '-', base)         # Convert spaces and decimals to hyphens
-        base = base.lower()                          # Convert to lowercase
-        slug = base[0:chars]                         # Trim to first chars
-        for i in range(5):
-            if model.objects.filter(slug=slug).count() > 0:
-                slug = "%s-%06x" % (base[0:chars-7], random.randrange(0, 0x1000000))
+    class SlugReservations:
+        """
+        Hands out unique slugs for one run. The existing slugs of a model are loaded into a set once,
+        on first use, and every slug handed out is reserved in memory, so names within a batch never
+        collide and no query is issued per name. The set is loaded inside the script's transaction;
+        a slug taken concurrently after that is rejected by the unique constraint on the slug field.
+        """
+
+        def __init__(self):
+            self.used = {}
+
+        def reserve(self, model, name, chars=50):
+            base = str(name)
+            base = re.sub(r'[^-.\w\s]', '', base)        # Remove unneeded chars
+            base = re.sub(r'^[\s.]+|[\s.]+$', '', base)  # Trim leading/trailing spaces
+            base = re.sub(r'[-.\s]+', '-', base)         # Convert spaces and decimals to hyphens
+            base = base.lower()                          # Convert to lowercase
+            slug = base[0:chars]                         # Trim to first chars
+            if model not in self.used:
+                self.used[model] = set(model.objects.values_list('slug', flat=True))
+            used = self.used[model]
+            for i in range(5):
+                if slug in used:
+                    slug = "%s-%06x" % (base[0:chars-7], random.randrange(0, 0x1000000))
+                else:
+                    used.add(slug)
+                    return slug
+            else:
+                raise AbortScript("It's not your lucky day - unable to create a unique slug")
+
+        def lazy(self, model, name):
+            """Returns a callable for get_or_create defaults, so that a slug is only reserved for new objects."""
+            return functools.partial(self.reserve, model, name)
+
+
+    def record_bulk_changes(objects, action=ObjectChangeActionChoices.ACTION_CREATE):
+        """
+        bulk_create, bulk_update and queryset updates bypass the post_save handlers that write NetBox's
+        changelog and search cache. This writes the ObjectChange rows of the given objects with one bulk
+        insert, attributed to the user and request of the running script, and re-caches the objects in
+        the search backend.
+        """
+        objects = list(objects)
+        if not objects:
+            return
+        request = current_request.get()
+        object_changes = []
+        for obj in objects:
+            object_change = obj.to_objectchange(action)
+            if request is not None:
+                object_change.user = request.user
+                object_change.user_name = request.user.username
+                object_change.request_id = request.id
+            object_changes.append(object_change)
+        ObjectChange.objects.bulk_create(object_changes)
+        search_backend.cache(objects)
+
+
+    def bulk_tag(objects, tag):
+        """
+        Attaches a tag to all given objects with a single insert on the tag through table, and records
+        the newly tagged objects as updated in the changelog and search cache.
+        """
+        content_type = ContentType.objects.get_for_model(objects[0])
+        object_ids = {obj.pk for obj in objects}
+        object_ids -= set(TaggedItem.objects.filter(tag=tag, content_type=content_type, object_id__in=object_ids).values_list('object_id', flat=True))
+        TaggedItem.objects.bulk_create([
+            TaggedItem(tag=tag, content_type=content_type, object_id=object_id) for object_id in sorted(object_ids)
+        ])
+        record_bulk_changes({obj.pk: obj for obj in objects if obj.pk in object_ids}.values(), ObjectChangeActionChoices.ACTION_UPDATE)
+
+
+    def intent_fingerprint(*parts):
+        """Returns a stable hash of YAML data, independent of key order."""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+    def ttl_cache(seconds):
+        """Caches the results of a function per argument tuple for the given number of seconds."""
+        def decorator(func):
+            cache = {}
+
+            @functools.wraps(func)
+            def wrapper(*args):
+                now = time.monotonic()
+                if args not in cache or now - cache[args][0] > seconds:
+                    cache[args] = (now, func(*args))
+                return cache[args][1]
+            return wrapper
+        return decorator
+
+
+    class LazyChoiceVar(ChoiceVar):
+        """ChoiceVar whose choices are loaded when the form is built instead of when the module is imported."""
+
+        def __init__(self, choices_loader, *args, **kwargs):
+            super().__init__((), *args, **kwargs)
+            self.choices_loader = choices_loader
+
+        def as_field(self):
+            self.field_attrs['choices'] = ((None, '---------'),) + tuple(self.choices_loader())
+            return super().as_field()
+
+
+    class LazyObjectVar(ObjectVar):
+        """ObjectVar whose default is looked up when the form is built instead of when the module is imported."""
+
+        def __init__(self, *args, default_loader=None, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.default_loader = default_loader
+
+        def as_field(self):
+            self.field_attrs['initial'] = self.default_loader()
+            return super().as_field()
+
+
+    @ttl_cache(60)
+    def custom_field_choices(name):
+        with suppress(CustomFieldChoiceSet.DoesNotExist):
+            return CustomFieldChoiceSet.objects.get(name=name).choices
+        return []
+
+
+    @ttl_cache(60)
+    def device_type_pk(slug):
+        return DeviceType.objects.filter(slug=slug).values_list('pk', flat=True).first()
+
+
+    def changed_fields(obj, **fields):
+        """Returns the subset of fields whose value differs from the current value on obj."""
+        changed = {}
+        for name, value in fields.items():
+            if isinstance(value, models.Model) or (value is None and hasattr(obj, f"{name}_id")):
+                current, new = getattr(obj, f"{name}_id"), value.pk if value is not None else None
             else:
-                return slug
+                current, new = getattr(obj, name), value
+            if current != new or new is None and isinstance(value, models.Model):
+                changed[name] = value
+        return changed
+
+
+    PlannedChange = namedtuple('PlannedChange', ['action', 'model', 'key', 'fields'])
+
+
+    class ChangePlan:
+        """
+        A typed list of the create, update and delete operations an import would perform.
+        Plans are computed from a snapshot read of the current state without any writes.
+        """
+
+        def __init__(self):
+            self.changes = []
+            self.errors = []
+
+        def create(self, model, key, **fields):
+            self.changes.append(PlannedChange('create', model, key, fields))
+
+        def update(self, model, key, **fields):
+            if fields:
+                self.changes.append(PlannedChange('update', model, key, fields))
+
+        def delete(self, model, key):
+            self.changes.append(PlannedChange('delete', model, key, {}))
+
+        def error(self, message):
+            self.errors.append(message)
+
+        def summary(self):
+            counts = Counter((change.action, change.model._meta.verbose_name_plural) for change in self.changes)
+            summary = ", ".join(f"{action} {count} {name}" for (action, name), count in sorted(counts.items()))
+            return summary or "no changes"
+
+        def log(self, script):
+            for change in self.changes:
+                fields = ", ".join(f"{name}={value}" for name, value in change.fields.items())
+                script.log_info(
+                    f"Would {change.action} {change.model._meta.verbose_name} '{change.key}'{': ' + fields if fields else ''}",
+                    category=change.model._meta.verbose_name_plural,
+                    full=True,
+                )
+            for message in self.errors:
+                script.log_failure(message)
+            script.log_success(f"Planned changes: {self.summary()}. No changes have been made.")
+
+
+    LOG_VERBOSITY_CHOICES = (
+        ('summary', 'Summary'),
+        ('full', 'Full'),
+    )
+
+
+    def summarised_log(run):
+        """Decorator for Script.run that writes the aggregated job log summary once the run ends."""
+        @functools.wraps(run)
+        def wrapper(self, data, commit):
+            self.log_verbosity_level = data.get('log_verbosity') or 'summary'
+            try:
+                return run(self, data, commit)
+            finally:
+                self.log_summary()
+        return wrapper
+
+
+    class SummaryLogMixin:
+        """
+        Keeps per-category counters and a capped sample of success and info messages instead of
+        writing one job log entry per touched object. Warnings, failures and messages logged with
+        full=True, such as the entries of a dry run plan, are always logged in full.
+        """
+        log_sample_size = 25
+
+        log_verbosity = ChoiceVar(
+            choices=LOG_VERBOSITY_CHOICES,
+            default='summary',
+            description="Summary logs counters and a sample of messages, full logs every message",
+            required=False,
+        )
+
+        def _aggregate(self, level, category):
+            """Counts the message and returns True if it should be left out of the job log."""
+            if getattr(self, 'log_verbosity_level', 'full') == 'full':
+                return False
+            if not hasattr(self, 'log_counters'):
+                self.log_counters = Counter()
+                self.log_sampled = Counter()
+            category = category or 'other'
+            self.log_counters[(category, level)] += 1
+            if self.log_sampled[category] < self.log_sample_size:
+                self.log_sampled[category] += 1
+                return False
+            return True
+
+        def log_success(self, message, *args, category=None, full=False, **kwargs):
+            if full or not self._aggregate('success', category):
+                super().log_success(message, *args, **kwargs)
+
+        def log_info(self, message, *args, category=None, full=False, **kwargs):
+            if full or not self._aggregate('info', category):
+                super().log_info(message, *args, **kwargs)
+
+        def log_warning(self, message, *args, category=None, **kwargs):
+            super().log_warning(message, *args, **kwargs)
+
+        def log_failure(self, message, *args, category=None, **kwargs):
+            super().log_failure(message, *args, **kwargs)
+
+        def log_summary(self):
+            counters = getattr(self, 'log_counters', None)
+            if not counters:
+                return
+            for category in sorted({category for category, _ in counters}):
+                total = counters[(category, 'success')] + counters[(category, 'info')]
+                hidden = total - self.log_sampled[category]
+                details = f"{counters[(category, 'success')]} success, {counters[(category, 'info')]} info"
+                if hidden:
+                    details += f", {hidden} messages not shown"
+                super().log_info(f"Summary for {category}: {details}")
+            del self.log_counters
+
+
+    class PendingChanges:
+        """
+        Accumulates field and custom field changes per object during a run and writes every
+        changed object with a single save on flush. Values that match the current state are not
+        recorded, so objects without real changes are never saved and produce no changelog entry.
+        """
+
+        def __init__(self):
+            self.pending = {}
+
+        def _mark(self, obj):
+            if id(obj) not in self.pending:
+                # Snapshot the pre-change state so the changelog entry shows the full diff
+                if obj.pk and hasattr(obj, 'snapshot'):
+                    obj.snapshot()
+                self.pending[id(obj)] = obj
+
+        def set(self, obj, **fields):
+            for name, value in changed_fields(obj, **fields).items():
+                self._mark(obj)
+                setattr(obj, name, value)
+
+        def set_custom_fields(self, obj, **values):
+            for key, value in values.items():
+                if obj.custom_field_data.get(key) != value:
+                    self._mark(obj)
+                    obj.custom_field_data[key] = value
+
+        def flush(self):
+            """Save every object with recorded changes once and return the saved objects."""
+            saved = list(self.pending.values())
+            for obj in saved:
+                obj.save()
+            self.pending.clear()
+            return saved
+
+
+    class ASNAllocator:
+        """
+        Hands out free ASNs from an ASN range. The ASNs already in use are loaded once per run and
+        handed out numbers are reserved in memory; the cursor only moves forward, so allocations
+        are amortised O(1) regardless of the range size.
+        """
+
+        def __init__(self, asn_range):
+            self.asn_range = asn_range
+            self.used = set(ASN.objects.filter(asn__range=(asn_range.start, asn_range.end)).values_list('asn', flat=True))
+            self.cursor = asn_range.start
+
+        def allocate(self, count=1):
+            """Reserve and return the next count free ASNs in ascending order."""
+            allocated = []
+            while len(allocated) < count:
+                if self.cursor > self.asn_range.end:
+                    raise AbortScript(f"No free ASN available within the range {self.asn_range.start}-{self.asn_range.end}.")
+                if self.cursor not in self.used:
+                    self.used.add(self.cursor)
+                    allocated.append(self.cursor)
+                self.cursor += 1
+            return allocated
+
+
+    class PrefixIPAllocator:
+        """
+        Hands out free addresses of a prefix. The free space is computed once per run with the
+        same rules as Prefix.get_available_ips() and walked lazily range by range, so even a /16
+        is never materialised as a list.
+        """
+
+        def __init__(self, prefix):
+            self.prefix = prefix
+            self.free_ips = itertools.chain.from_iterable(prefix.get_available_ips().iter_ipranges())
+
+        def allocate(self, count=1):
+            """Reserve and return up to count free addresses, in ascending order."""
+            return list(itertools.islice(self.free_ips, count))
+
+
+    class ISLPairAllocator:
+        """
+        Hands out free /31 address pairs of an ISL prefix. The addresses used in the prefix are
+        loaded once per run into a set of occupied /31 blocks; the cursor only moves forward, so
+        allocations are amortised O(1) instead of one query per candidate subnet.
+        """
+
+        def __init__(self, prefix):
+            self.prefix = prefix
+            network = IPNetwork(str(prefix.prefix))
+            self.version = network.version
+            self.first = network.first
+            self.blocks = network.size // 2
+            self.used = {(int(address.ip) - self.first) // 2 for address in prefix.get_child_ips().values_list('address', flat=True)}
+            self.cursor = 0
+
+        def allocate(self, count=1):
+            """Reserve and return up to count free (a, b) /31 address pairs, in ascending order."""
+            pairs = []
+            while len(pairs) < count and self.cursor < self.blocks:
+                if self.cursor not in self.used:
+                    self.used.add(self.cursor)
+                    base = self.first + 2 * self.cursor
+                    pairs.append((
+                        f"{NIPAddress(base, self.version)}/31",
+                        f"{NIPAddress(base + 1, self.version)}/31",
+                    ))
+                self.cursor += 1
+            return pairs
+
+
+    class FreePortIndex:
+        """
+        Index of the ports still free for fabric links, loaded for all given devices with a single
+        query and kept per device in natural name order.
+        """
+
+        def __init__(self, devices):
+            self.ports = {device.pk: [] for device in devices}
+            eligible_interfaces = Interface.objects.filter(device__in=devices, tagged_vlans=None, lag=None, cable=None).exclude(name__contains='.').exclude(type='virtual').exclude(name__contains='mgmt').exclude(type="lag").exclude(type='10gbase-x-sfpp').select_related('device').order_by('device', '_name')
+            for interface in eligible_interfaces:
+                self.ports[interface.device_id].append(interface)
+
+
+    def link_table(lowers, uppers, new_device_ids=None):
+        """
+        Returns the links between two device tiers as (i, j, row, column, offset) tuples: lowers[i]
+        connects to uppers[j], the link is the row-th link of the lower device and the column-th link
+        of the upper device, and offset is the position of its /31 pair within the table. A full mesh
+        is written out in closed form; only in expansion mode are the pairs iterated, to keep the
+        links that touch a new device and rank them among the new devices of the other tier.
+        """
+        if new_device_ids is None:
+            width = len(uppers)
+            return [(i, j, j, i, i * width + j) for i in range(len(lowers)) for j in range(width)]
+
+        lower_ranks = {i: rank for rank, i in enumerate(i for i, device in enumerate(lowers) if device.pk in new_device_ids)}
+        upper_ranks = {j: rank for rank, j in enumerate(j for j, device in enumerate(uppers) if device.pk in new_device_ids)}
+        table = []
+        for i in range(len(lowers)):
+            for j in range(len(uppers)):
+                # A new lower device links to every upper device, an existing one only to the new ones (and vice versa)
+                if i in lower_ranks or j in upper_ranks:
+                    table.append((i, j, j if i in lower_ranks else upper_ranks[j], i if j in upper_ranks else lower_ranks[i], len(table)))
+        return table
+
+
+    def lags_by_mh_id(mh_ids, location=None):
+        """
+        LAG interfaces with the given multihome ID or IDs, optionally within a location. The filter matches
+        the expression index InitializeNetbox creates on the Iface_mh_id key of LAG interfaces.
+        """
+        if isinstance(mh_ids, (list, tuple, set)):
+            lags = Interface.objects.filter(type='lag', custom_field_data__Iface_mh_id__in=[int(mh_id) for mh_id in mh_ids])
         else:
-            raise AbortScript("It's not your lucky day - unable to create a unique slug")
+            lags = Interface.objects.filter(type='lag', custom_field_data__Iface_mh_id=int(mh_ids))
+        if location is not None:
+            lags = lags.filter(device__location=location)
+        return lags
+
+
+    def parse_id_list(value, max_ids=1000):
+        """
+        Parses a list of IDs and ID ranges such as '10,12-14' into a sorted list of unique integers.
+        At most max_ids IDs are accepted in total, so a wide range cannot build a huge set and query.
+        """
+        ids = set()
+        for part in str(value).replace(' ', '').split(','):
+            if not part:
+                continue
+            start, _, end = part.partition('-')
+            try:
+                start = int(start)
+                end = int(end or start)
+            except ValueError:
+                raise AbortScript(f"Invalid ID or ID range '{part}'.")
+            if start < 1:
+                raise AbortScript(f"'{part}' is not a positive ID or ID range.")
+            if end < start:
+                raise AbortScript(f"ID range '{part}' is empty, its end is lower than its start.")
+            if end - start + 1 > max_ids:
+                raise AbortScript(f"ID range '{part}' spans {end - start + 1} IDs, at most {max_ids} are allowed.")
+            ids.update(range(start, end + 1))
+            if len(ids) > max_ids:
+                raise AbortScript(f"'{value}' lists more than {max_ids} IDs.")
+        if not ids:
+            raise AbortScript(f"'{value}' does not contain any ID.")
+        return sorted(ids)
+
+
+    class FabricReferenceResolver:
+        """
+        Loads every device role, device type, platform and ASN referenced by the devices
+        of a fabric YAML in one query per model and answers the per-device lookups from memory.
+        """
+
+        def __init__(self, devices_data, rir, extra_asns=()):
+            self.rir = rir
+            role_names = {device_info['role_name'] for device_info in devices_data}
+            type_slugs = {device_info['type_slug'] for device_info in devices_data}
+            platform_slugs = {device_info['platform_slug'] for device_info in devices_data}
+            self.asn_numbers = {int(device_info['asn_number']) for device_info in devices_data}
+            self.asn_numbers.update(int(asn) for asn in extra_asns)
+
+            self.roles = {role.name: role for role in DeviceRole.objects.filter(name__in=role_names)}
+            self.device_types = {device_type.slug: device_type for device_type in DeviceType.objects.filter(slug__in=type_slugs)}
+            self.platforms = {platform.slug: platform for platform in Platform.objects.filter(slug__in=platform_slugs)}
+            self.asns = {asn.asn: asn for asn in ASN.objects.filter(asn__in=self.asn_numbers)}
+
+            self.missing = []
+            self.missing += [f"device role '{name}'" for name in sorted(role_names - self.roles.keys())]
+            self.missing += [f"device type '{slug}'" for slug in sorted(type_slugs - self.device_types.keys())]
+            self.missing += [f"platform '{slug}'" for slug in sorted(platform_slugs - self.platforms.keys())]
+
+        def create_missing_asns(self):
+            """Create all referenced ASNs that do not exist yet with a single bulk insert."""
+            new_asns = [ASN(asn=number, rir=self.rir) for number in sorted(self.asn_numbers - self.asns.keys())]
+            for asn in ASN.objects.bulk_create(new_asns):
+                self.asns[asn.asn] = asn
+            record_bulk_changes(new_asns)
+            return new_asns
+
+        def asn(self, number):
+            return self.asns[int(number)]
+
+        def resolve(self, device_info):
+            """Return the (role, device type, platform, ASN) tuple for a device entry."""
+            return (
+                self.roles[device_info['role_name']],
+                self.device_types[device_info['type_slug']],
+                self.platforms[device_info['platform_slug']],
+                self.asn(device_info['asn_number']),
+            )
 
 
-    MH_mode_choices = []
-    with suppress(CustomFieldChoiceSet.DoesNotExist):
-        MH_mode_choices = CustomFieldChoiceSet.objects.get(name="MH_mode").choices
+    class FabricAddressingMixin:
+        """Management and system addressing shared by the fabric creation scripts."""
 
+        def assign_ip_addresses(self, devices, interface_name, ip_allocator):
+            """
+            Assign an IP address from the allocator's prefix to the specified interface of every device,
+            based on the prefix role. For management IPs, also set the IP as the primary IP for the device.
+            Missing interfaces and all IP addresses are created with one bulk insert each.
+            """
+            prefix = ip_allocator.prefix
+
+            # Retrieve or create the specified interface for every device
+            interfaces = {interface.device_id: interface for interface in Interface.objects.filter(device__in=devices, name=interface_name)}
+            new_interfaces = [
+                Interface(device=device, name=interface_name, type='virtual' if prefix.role.slug == 'system' else '1000base-t')
+                for device in devices if device.pk not in interfaces
+            ]
+            for interface in Interface.objects.bulk_create(new_interfaces):
+                interfaces[interface.device_id] = interface
+                self.log_success(f"Created {interface_name} interface for device {interface.device.name}.", category='interface')
+            record_bulk_changes(new_interfaces)
+
+            # Take the next free addresses of the prefix for all devices at once
+            available_ips = ip_allocator.allocate(len(devices))
+            if len(available_ips) < len(devices):
+                self.log_failure(f"No available IP addresses in prefix {prefix} for {interface_name} on {', '.join(device.name for device in devices[len(available_ips):])}.")
 
-    class ImportFabricFromYAML(Script):
+            # Determine the subnet mask
+            subnet_mask = '/32' if prefix.role.slug == 'system' else f"/{prefix.prefix.prefixlen}"
+            ip_objs = IPAddress.objects.bulk_create([
+                IPAddress(
+                    address=f"{available_ip}{subnet_mask}",
+                    status='active',
+                    description=f"{prefix.role.name} IP for {device.name}",
+                    assigned_object=interfaces[device.pk],
+                )
+                for device, available_ip in zip(devices, available_ips)
+            ])
+            record_bulk_changes(ip_objs)
+
+            changes = PendingChanges()
+            for device, ip_obj in zip(devices, ip_objs):
+                self.log_success(f"Assigned {ip_obj.address} to {interface_name} on {device.name}.", category='ip address')
+
+                # Specifically handle the management IP: assign to interface and set as primary
+                if prefix.role.slug == 'management':
+                    changes.set(device, primary_ip4=ip_obj)
+                    self.log_success(f"Set {ip_obj.address} as primary management IP for {device.name}.", category='ip address')
+            changes.flush()
+
+
+    ClosDevice = namedtuple('ClosDevice', ['name', 'role', 'pod', 'plane', 'asn'])
+    ClosLink = namedtuple('ClosLink', ['a_device', 'a_port', 'b_device', 'b_port', 'a_address', 'b_address'])
+
+
+    class ClosTopologyPlanner:
+        """
+        Plans a 3-stage (leaf/spine) or 5-stage (leaf/spine/superspine) Clos fabric as an in-memory
+        graph of devices and links, including ports, ASNs and /31 addresses. Every pod has one spine
+        per plane, the spines of plane n connect to the superspines of plane n, and border leaves
+        connect to the top tier. Devices use their last ports for uplinks and their first ports for
+        downlinks. Nothing is written to the database until persist() is called.
+        """
+
+        def __init__(self, site_name, pods, leaves_per_pod, planes, superspines_per_plane, border_leaves, device_types):
+            self.site_name = site_name
+            self.pods = pods
+            self.leaves_per_pod = leaves_per_pod
+            self.planes = planes
+            self.superspines_per_plane = superspines_per_plane
+            self.border_leaves = border_leaves
+            self.device_types = device_types
+            self.devices = []
+            self.links = []
+            self.errors = []
+            self.ports = {}
+            self.used_uplinks = Counter()
+            self.used_downlinks = Counter()
+
+        def load_ports(self):
+            """Loads the fabric-capable port names of every device type with a single query."""
+            roles = {}
+            for role, device_type in self.device_types.items():
+                roles.setdefault(device_type.pk, []).append(role)
+                self.ports[role] = []
+            templates = InterfaceTemplate.objects.filter(device_type__in=self.device_types.values()).exclude(name__contains='.').exclude(type='virtual').exclude(name__contains='mgmt').exclude(type="lag").exclude(type='10gbase-x-sfpp').order_by('device_type', '_name')
+            for template in templates:
+                for role in roles[template.device_type_id]:
+                    self.ports[role].append(template.name)
+
+        def add_device(self, name, role, asn, pod=None, plane=None):
+            device = ClosDevice(name, role, pod, plane, asn)
+            self.devices.append(device)
+            return device
+
+        def take_port(self, device, uplink):
+            """Returns the next free uplink or downlink port name of the device, or None if none is left."""
+            ports = self.ports[device.role]
+            if self.used_uplinks[device.name] + self.used_downlinks[device.name] >= len(ports):
+                return None
+            if uplink:
+                self.used_uplinks[device.name] += 1
+                return ports[-self.used_uplinks[device.name]]
+            self.used_downlinks[device.name] += 1
+            return ports[self.used_downlinks[device.name] - 1]
+
+        def add_link(self, lower, upper):
+            a_port = self.take_port(lower, uplink=True)
+            b_port = self.take_port(upper, uplink=False)
+            if a_port is None or b_port is None:
+                self.errors.append(f"No free port left to connect {lower.name} to {upper.name}.")
+                return
+            self.links.append(ClosLink(lower, a_port, upper, b_port, None, None))
+
+        def plan(self, asn_allocator, isl_allocator):
+            """Builds the device and link graph and assigns ports, ASNs and /31 pairs to it."""
+            if self.pods < 1 or self.leaves_per_pod < 1 or self.planes < 1:
+                self.errors.append("A fabric needs at least one pod, one leaf per pod and one plane.")
+            if self.pods > 1 and not self.superspines_per_plane:
+                self.errors.append("A fabric with more than one pod needs superspines to connect the pods.")
+            for role in self.required_roles():
+                if self.device_types.get(role) is None:
+                    self.errors.append(f"No device type selected for the {role} role.")
+            if self.errors:
+                return self
+            self.load_ports()
+
+            # All superspines share one ASN, the spines of a pod share one ASN and every leaf has its own
+            superspine_asn = asn_allocator.allocate()[0] if self.superspines_per_plane else None
+            spine_asns = asn_allocator.allocate(self.pods)
+            leaf_asns = iter(asn_allocator.allocate(self.pods * self.leaves_per_pod + self.border_leaves))
+
+            superspines = {
+                (plane, index): self.add_device(f"{self.site_name}-superspine-{plane}-{index}", 'superspine', superspine_asn, plane=plane)
+                for plane in range(1, self.planes + 1)
+                for index in range(1, self.superspines_per_plane + 1)
+            }
+            spines = {}
+            for pod in range(1, self.pods + 1):
+                for plane in range(1, self.planes + 1):
+                    spine = self.add_device(f"{self.site_name}-pod{pod}-spine-{plane}", 'spine', spine_asns[pod - 1], pod=pod, plane=plane)
+                    spines[(pod, plane)] = spine
+                    for index in range(1, self.superspines_per_plane + 1):
+                        self.add_link(spine, superspines[(plane, index)])
+                for index in range(1, self.leaves_per_pod + 1):
+                    leaf = self.add_device(f"{self.site_name}-pod{pod}-leaf-{index}", 'leaf', next(leaf_asns), pod=pod)
+                    for plane in range(1, self.planes + 1):
+                        self.add_link(leaf, spines[(pod, plane)])
+
+            # Border leaves attach to the top tier: the superspines, or the spines of a single-pod fabric
+            top_tier = list(superspines.values()) or [spines[(1, plane)] for plane in range(1, self.planes + 1)]
+            for index in range(1, self.border_leaves + 1):
+                border_leaf = self.add_device(f"{self.site_name}-borderleaf-{index}", 'borderleaf', next(leaf_asns))
+                for upper in top_tier:
+                    self.add_link(border_leaf, upper)
+
+            pairs = isl_allocator.allocate(len(self.links))
+            if len(pairs) < len(self.links):
+                self.errors.append(f"The ISL prefix {isl_allocator.prefix.prefix} has only {len(pairs)} free /31 subnets for {len(self.links)} links.")
+            self.links = [link._replace(a_address=a_address, b_address=b_address) for link, (a_address, b_address) in zip(self.links, pairs)]
+            return self
+
+        def required_roles(self):
+            roles = ['leaf', 'spine']
+            if self.superspines_per_plane:
+                roles.append('superspine')
+            if self.border_leaves:
+                roles.append('borderleaf')
+            return roles
+
+        def validate(self):
+            """Checks the planned graph against the existing devices and returns the list of errors."""
+            existing = set(Device.objects.filter(name__in=[device.name for device in self.devices]).values_list('name', flat=True))
+            for name in sorted(existing):
+                self.errors.append(f"Device {name} already exists.")
+            return self.errors
+
+        def asn_descriptions(self):
+            descriptions = {}
+            for device in self.devices:
+                if device.role == 'superspine':
+                    descriptions.setdefault(device.asn, f"{self.site_name} Superspines")
+                elif device.role == 'spine':
+                    descriptions.setdefault(device.asn, f"{self.site_name} Pod {device.pod} Spines")
+                elif device.role == 'borderleaf':
+                    descriptions.setdefault(device.asn, f"{self.site_name} Border Leaf")
+                else:
+                    descriptions.setdefault(device.asn, f"{self.site_name} Leaf")
+            return descriptions
+
+        def change_plan(self):
+            """Returns the planned graph as a ChangePlan for dry runs."""
+            plan = ChangePlan()
+            for asn, description in self.asn_descriptions().items():
+                plan.create(ASN, asn, description=description)
+            for device in self.devices:
+                plan.create(Device, device.name, role=device.role, device_type=self.device_types[device.role], asn=device.asn)
+            for link in self.links:
+                plan.create(Cable, f"{link.a_device.name}:{link.a_port} - {link.b_device.name}:{link.b_port}", addresses=f"{link.a_address} {link.b_address}")
+            for message in self.errors:
+                plan.error(message)
+            return plan
+
+        def persist(self, script, site, location, rir, isl_tag):
+            """
+            Writes a validated plan: ASNs and ISL addresses with one bulk insert each, the devices
+            (which instantiate their interfaces from the device type templates), then all cables
+            and the 'isl' tag with one bulk insert.
+            Returns the created devices.
+            """
+            roles = {role.slug: role for role in DeviceRole.objects.filter(slug__in=self.required_roles())}
+            asns = {asn.asn: asn for asn in ASN.objects.bulk_create([
+                ASN(asn=asn, rir=rir, description=description) for asn, description in self.asn_descriptions().items()
+            ])}
+            record_bulk_changes(asns.values())
+            script.log_success(f"Created {len(asns)} ASNs.", category='asn')
+
+            devices = {}
+            for planned in self.devices:
+                device = Device(
+                    name=planned.name,
+                    device_role=roles[planned.role],
+                    device_type=self.device_types[planned.role],
+                    site=site,
+                    location=location,
+                )
+                device.custom_field_data['ASN'] = asns[planned.asn].id
+                device.save()
+                devices[planned.name] = device
+                script.log_success(f"{planned.role.capitalize()} {planned.name} created with ASN {planned.asn}.", category='device')
+
+            # Resolve all link endpoints with one query
+            interfaces = {
+                (interface.device.name, interface.name): interface
+                for interface in Interface.objects.filter(device__in=devices.values()).select_related('device')
+            }
+            endpoints = [
+                (interfaces[(link.a_device.name, link.a_port)], interfaces[(link.b_device.name, link.b_port)])
+                for link in self.links
+            ]
+
+            for interface_a, interface_b in endpoints:
+                Cable(a_terminations=[interface_a], b_terminations=[interface_b], status="connected").save()
+            script.log_success(f"Created {len(endpoints)} cables.", category='cable')
+
+            if endpoints:
+                bulk_tag([interface for endpoint in endpoints for interface in endpoint], isl_tag)
+            record_bulk_changes(IPAddress.objects.bulk_create([
+                IPAddress(address=address, status='active', description=f"ISL IP for {interface.device.name}", assigned_object=interface)
+                for (interface_a, interface_b), link in zip(endpoints, self.links)
+                for interface, address in ((interface_a, link.a_address), (interface_b, link.b_address))
+            ]))
+            script.log_success(f"Assigned {2 * len(endpoints)} ISL addresses.", category='ip address')
+
+            return list(devices.values())
+
+
+    class ImportFabricFromYAML(SummaryLogMixin, Script):
         class Meta:
             name = "Create fabric from YAML"
             description = "Sets up sites, locations, RIRs, ASNs, devices, and management IPs from YAML file."
-            field_order = ['yamlfile']
+            field_order = ['yamlfile', 'full_sync', 'log_verbosity']
 
         yamlfile = FileVar(
             description="Upload YAML file for the setup",
         )
+        full_sync = BooleanVar(
+            description="Re-apply all devices, also those whose intent did not change since the last import",
+            default=False,
+        )
 
         def translate_interface_name(self, short_name):
             """
@@ -110,122 +858,441 @@ if not is_migrating:
             # Return the name unchanged if it doesn't match any expected pattern
             return short_name
 
+        def sync_device_interfaces(self, device, interfaces_data):
+            """
+            Ensures the listed interfaces exist on the device and carry their IP addresses.
+            Existing interfaces and IPs are fetched with one query each, missing rows are
+            bulk created and IP assignments are written with a single bulk update.
+            Returns the IP addresses keyed by their address string.
+            """
+            names = {interface_info['name'] for interface_info in interfaces_data}
+            addresses = {str(IPNetwork(interface_info['ip_address'])) for interface_info in interfaces_data if interface_info.get('ip_address')}
+
+            interfaces = {interface.name: interface for interface in Interface.objects.filter(device=device, name__in=names)}
+            ip_addresses = {}
+            for ip_address in IPAddress.objects.filter(address__in=addresses):
+                ip_addresses.setdefault(str(ip_address.address), ip_address)
+
+            # Create the missing interfaces
+            new_interfaces = {}
+            for interface_info in interfaces_data:
+                name = interface_info['name']
+                if name in interfaces or name in new_interfaces:
+                    continue
+                interface_defaults = {}
+                # Set interface type if provided
+                if interface_info.get('type'):
+                    interface_defaults['type'] = interface_info['type']
+                new_interfaces[name] = Interface(device=device, name=name, **interface_defaults)
+
+            created_interfaces = Interface.objects.bulk_create(new_interfaces.values())
+            record_bulk_changes(created_interfaces)
+            for interface in created_interfaces:
+                interfaces[interface.name] = interface
+                self.log_success(f"Created interface {interface.name} on device {device.name}", category='interface')
+            for name in sorted(names - new_interfaces.keys()):
+                self.log_info(f"Interface {name} on device {device.name} already exists.", category='interface')
+
+            # Create missing IPs directly on their interface and move existing ones over
+            interface_type = ContentType.objects.get_for_model(Interface)
+            new_ips = []
+            reassigned_ips = []
+            for interface_info in interfaces_data:
+                if not interface_info.get('ip_address'):
+                    continue
+                interface = interfaces[interface_info['name']]
+                address = str(IPNetwork(interface_info['ip_address']))
+                ip_address = ip_addresses.get(address)
+                if ip_address is None:
+                    ip_address = IPAddress(address=address, assigned_object=interface)
+                    ip_addresses[address] = ip_address
+                    new_ips.append(ip_address)
+                elif ip_address.assigned_object_type_id != interface_type.pk or ip_address.assigned_object_id != interface.pk:
+                    ip_address.assigned_object = interface
+                    if ip_address not in reassigned_ips:
+                        reassigned_ips.append(ip_address)
+                    self.log_success(f"Assigned IP {address} to interface {interface.name} on device {device.name}", category='ip address')
+                else:
+                    self.log_info(f"Interface {interface.name} on device {device.name} already had IP {address}", category='ip address')
+
+            created_ips = IPAddress.objects.bulk_create(new_ips)
+            record_bulk_changes(created_ips)
+            for ip_address in created_ips:
+                self.log_success(f"Assigned IP {ip_address.address} to interface {ip_address.assigned_object.name} on device {device.name}", category='ip address')
+            if reassigned_ips:
+                IPAddress.objects.bulk_update(reassigned_ips, ['assigned_object_type', 'assigned_object_id'])
+                record_bulk_changes(reassigned_ips, ObjectChangeActionChoices.ACTION_UPDATE)
+
+            return ip_addresses
+
+        def parse_links(self, links_data):
+            """Splits the link endpoints into (device name, full interface name) pairs."""
+            links = []
+            for link in links_data:
+                endpoints = []
+                for endpoint in link['endpoints'][:2]:
+                    device_name, interface_short = endpoint.split(":")
+                    endpoints.append((device_name, self.translate_interface_name(interface_short)))
+                links.append(endpoints)
+            return links
+
+        def resolve_cables(self, link_endpoints, interfaces):
+            """
+            Matches the parsed YAML links against interfaces keyed by (device name, interface name).
+            Used by both plan() and the import, so a dry run reports exactly the cables the import
+            creates. Returns the links to cable as (endpoints, interface_a, interface_b), the links
+            with a missing endpoint and the links with an endpoint that is already cabled, including
+            endpoints cabled by an earlier link of the same batch.
+            """
+            cables = []
+            missing = []
+            already_cabled = []
+            cabled = set()
+            for endpoints in link_endpoints:
+                interface_a, interface_b = (interfaces.get(endpoint) for endpoint in endpoints)
+                if interface_a is None or interface_b is None:
+                    missing.append(endpoints)
+                elif interface_a.cable_id or interface_b.cable_id or cabled & set(endpoints):
+                    already_cabled.append(endpoints)
+                else:
+                    cabled.update(endpoints)
+                    cables.append((endpoints, interface_a, interface_b))
+            return cables, missing, already_cabled
+
+        def create_links(self, links_data, isl_tag):
+            """
+            Cables the link endpoints listed in the YAML. All endpoints are translated up front
+            and resolved with a single query, the 'isl' tag is attached with one bulk insert.
+            Returns the links with a missing endpoint.
+            """
+            # Parse and translate all endpoints before touching the database
+            links = self.parse_links(links_data)
+
+            # Fetch all endpoint interfaces from NetBox at once
+            device_names = {device_name for endpoints in links for device_name, _ in endpoints}
+            interface_names = {interface_name for endpoints in links for _, interface_name in endpoints}
+            interfaces = {
+                (interface.device.name, interface.name): interface
+                for interface in Interface.objects.filter(device__name__in=device_names, name__in=interface_names).select_related('device')
+            }
+            cables, missing, already_cabled = self.resolve_cables(links, interfaces)
+
+            for (device_a_name, interface_a_name), (device_b_name, interface_b_name) in missing:
+                self.log_failure(f"Cannot find both endpoints of link {device_a_name}:{interface_a_name} - {device_b_name}:{interface_b_name}")
+            for (device_a_name, interface_a_name), (device_b_name, interface_b_name) in already_cabled:
+                self.log_info(f"One of the interfaces already has a cable: {device_a_name}:{interface_a_name} or {device_b_name}:{interface_b_name}", category='cable')
+
+            for ((device_a_name, interface_a_name), (device_b_name, interface_b_name)), interface_a, interface_b in cables:
+                Cable(a_terminations=[interface_a], b_terminations=[interface_b], status="connected").save()
+                self.log_success(f"Cable created between {device_a_name}:{interface_a_name} and {device_b_name}:{interface_b_name}", category='cable')
+
+            # Add the "isl" tag to all newly cabled interfaces
+            if cables:
+                cabled_interfaces = [interface for _, interface_a, interface_b in cables for interface in (interface_a, interface_b)]
+                bulk_tag(cabled_interfaces, isl_tag)
+                self.log_success(f"Added 'isl' tag to {len(cabled_interfaces)} interfaces.", category='tag')
+
+            return missing
+
+        def select_changed_devices(self, yaml_data, full_sync=False):
+            """
+            Fingerprints every device subtree, including the links it terminates, and skips the
+            devices whose fingerprint matches the one stored by the previous import.
+            Returns the existing devices by name, the changed device entries and their fingerprints.
+            """
+            device_links = {device_info['name']: [] for device_info in yaml_data['devices']}
+            for link in yaml_data.get('links', []):
+                for endpoint in link['endpoints'][:2]:
+                    device_links.setdefault(endpoint.split(":")[0], []).append(sorted(link['endpoints'][:2]))
+            existing_devices = {device.name: device for device in Device.objects.filter(name__in=device_links.keys())}
+
+            changed_devices = []
+            fingerprints = {}
+            for device_info in yaml_data['devices']:
+                fingerprint = intent_fingerprint(yaml_data['site']['name'], yaml_data['location']['name'], device_info, sorted(device_links[device_info['name']]))
+                device = existing_devices.get(device_info['name'])
+                if not full_sync and device is not None and device.custom_field_data.get('Intent_hash') == fingerprint:
+                    continue
+                fingerprints[device_info['name']] = fingerprint
+                changed_devices.append(device_info)
+
+            return existing_devices, changed_devices, fingerprints
+
+        def plan(self, yaml_data, full_sync=False):
+            """
+            Computes the changes an import of the YAML would make from a single read pass over
+            the current state. Nothing is written to the database.
+            """
+            plan = ChangePlan()
+
+            site_name = yaml_data['site']['name']
+            site = Site.objects.filter(name=site_name).first()
+            if site is None:
+                site = Site(name=site_name)
+                plan.create(Site, site_name)
+
+            location_name = yaml_data['location']['name']
+            location = Location.objects.filter(name=location_name).first()
+            if location is None:
+                location = Location(name=location_name, site=site)
+                plan.create(Location, location_name, site=site_name)
+
+            default_rir = RIR.objects.filter(name="Private").first()
+            if default_rir is None:
+                plan.create(RIR, "Private", is_private=True)
+
+            existing_devices, changed_devices, fingerprints = self.select_changed_devices(yaml_data, full_sync)
+
+            overlay_asn_number = yaml_data.get('overlay_asn', {}).get('number')
+            references = FabricReferenceResolver(
+                changed_devices,
+                default_rir,
+                extra_asns=[overlay_asn_number] if overlay_asn_number else [],
+            )
+            for message in references.missing:
+                plan.error(f"Missing reference in YAML file: {message}")
+            if plan.errors:
+                return plan
+            for number in sorted(references.asn_numbers - references.asns.keys()):
+                plan.create(ASN, number, rir="Private")
+
+            def asn_id(number):
+                asn = references.asns.get(int(number))
+                return asn.id if asn else None
+
+            if overlay_asn_number and (location.pk is None or location.custom_field_data.get('Overlay_ASN') != asn_id(overlay_asn_number)):
+                plan.update(Location, location_name, Overlay_ASN=overlay_asn_number)
+
+            # Snapshot all interfaces and IP addresses the changed devices and links refer to
+            changed_links = [
+                link for link in yaml_data.get('links', [])
+                if any(endpoint.split(":")[0] in fingerprints for endpoint in link['endpoints'][:2])
+            ]
+            link_endpoints = self.parse_links(changed_links)
+            device_names = set(fingerprints) | {device_name for endpoints in link_endpoints for device_name, _ in endpoints}
+            interfaces = {
+                (interface.device.name, interface.name): interface
+                for interface in Interface.objects.filter(device__name__in=device_names).select_related('device')
+            }
+            addresses = set()
+            for device_info in changed_devices:
+                addresses.add(str(IPNetwork(device_info['management_ip'])))
+                addresses.update(str(IPNetwork(interface_info['ip_address'])) for interface_info in device_info.get('interfaces', []) if interface_info.get('ip_address'))
+            ip_addresses = {}
+            for ip_address in IPAddress.objects.filter(address__in=addresses):
+                ip_addresses.setdefault(str(ip_address.address), ip_address)
+            interface_type = ContentType.objects.get_for_model(Interface)
+
+            # Interfaces the import will create. New devices instantiate the interfaces of their device
+            # type templates on save; those are loaded with one query up front and count as existing.
+            new_device_types = {
+                device_info['name']: references.device_types[device_info['type_slug']]
+                for device_info in changed_devices if device_info['name'] not in existing_devices
+            }
+            template_names = defaultdict(list)
+            for device_type_id, interface_name in InterfaceTemplate.objects.filter(device_type__in=set(new_device_types.values())).values_list('device_type_id', 'name'):
+                template_names[device_type_id].append(interface_name)
+            planned_interfaces = {
+                (device_name, interface_name)
+                for device_name, device_type in new_device_types.items()
+                for interface_name in template_names[device_type.pk]
+            }
+
+            for device_info in changed_devices:
+                role, device_type, platform, asn = references.resolve(device_info)
+                device_name = device_info['name']
+                device = existing_devices.get(device_name)
+                device_fields = {
+                    'device_type': device_type,
+                    'device_role': role,
+                    'platform': platform,
+                    'site': site,
+                    'location': location,
+                }
+                if device is None:
+                    plan.create(Device, device_name, **{name: str(value) for name, value in device_fields.items()})
+                    device = Device(name=device_name)
+                else:
+                    plan.update(Device, device_name, **{name: str(value) for name, value in changed_fields(device, **device_fields).items()})
+
+                mgmt_interface_info = {
+                    'name': 'mgmt0',
+                    'type': '1000base-t',
+                    'ip_address': device_info['management_ip'],
+                }
+                lag_interfaces_info = [{'name': lag_info['name'], 'type': 'lag'} for lag_info in device_info.get('lags', [])]
+                for interface_info in [mgmt_interface_info] + device_info.get('interfaces', []) + lag_interfaces_info:
+                    key = (device_name, interface_info['name'])
+                    if key not in interfaces and key not in planned_interfaces:
+                        planned_interfaces.add(key)
+                        plan.create(Interface, f"{device_name}:{interface_info['name']}", type=interface_info.get('type'))
+                    if not interface_info.get('ip_address'):
+                        continue
+                    address = str(IPNetwork(interface_info['ip_address']))
+                    ip_address = ip_addresses.get(address)
+                    interface = interfaces.get(key)
+                    if ip_address is None:
+                        plan.create(IPAddress, address, assigned_object=f"{device_name}:{interface_info['name']}")
+                    elif interface is None or ip_address.assigned_object_type_id != interface_type.pk or ip_address.assigned_object_id != interface.pk:
+                        plan.update(IPAddress, address, assigned_object=f"{device_name}:{interface_info['name']}")
+
+                device_changes = {}
+                mgmt_ip = ip_addresses.get(str(IPNetwork(device_info['management_ip'])))
+                if mgmt_ip is None or device.primary_ip4_id != mgmt_ip.pk:
+                    device_changes['primary_ip4'] = device_info['management_ip']
+                if device.custom_field_data.get('ASN') != asn_id(device_info['asn_number']):
+                    device_changes['ASN'] = device_info['asn_number']
+                device_changes['Intent_hash'] = fingerprints[device_name]
+                plan.update(Device, device_name, **device_changes)
+
+                for lag_info in device_info.get('lags', []):
+                    lag_interface = interfaces.get((device_name, lag_info['name']))
+                    lag_cf_changes = {}
+                    for key, cf_name in (('mh_id', 'Iface_mh_id'), ('mh_mode', 'Iface_mh_mode')):
+                        if key in lag_info and (lag_interface is None or lag_interface.custom_field_data.get(cf_name) != lag_info[key]):
+                            lag_cf_changes[cf_name] = lag_info[key]
+                    plan.update(Interface, f"{device_name}:{lag_info['name']}", **lag_cf_changes)
+
+                    for member_info in lag_info.get('inteterfaces', []):
+                        member_key = (device_name, member_info['name'])
+                        member_interface = interfaces.get(member_key)
+                        if member_interface is None and member_key not in planned_interfaces:
+                            planned_interfaces.add(member_key)
+                            plan.create(Interface, f"{device_name}:{member_info['name']}", lag=lag_info['name'])
+                        elif member_interface is None or lag_interface is None or member_interface.lag_id != lag_interface.pk:
+                            plan.update(Interface, f"{device_name}:{member_info['name']}", lag=lag_info['name'])
+
+            if not Tag.objects.filter(name="isl").exists():
+                plan.create(Tag, "isl")
+
+            # Links are resolved against the current and the planned interfaces, the latter as unsaved
+            # placeholders without a cable
+            for device_name, interface_name in planned_interfaces:
+                interfaces.setdefault((device_name, interface_name), Interface(name=interface_name))
+
+            def link_name(endpoints):
+                return " - ".join(f"{device_name}:{interface_name}" for device_name, interface_name in endpoints)
+
+            cables, missing, _ = self.resolve_cables(link_endpoints, interfaces)
+            for endpoints in missing:
+                plan.error(f"Cannot find both endpoints of link {link_name(endpoints)}")
+            for endpoints, _, _ in cables:
+                plan.create(Cable, link_name(endpoints), status="connected", tags="isl")
+
+            return plan
+
+        @summarised_log
         def run(self, data, commit):
             # Read and decode the YAML file content
             uploaded_file = data['yamlfile']
             yaml_content = uploaded_file.read().decode('utf-8')
             yaml_data = yaml.safe_load(yaml_content)
 
+            # Dry runs only compute and report the plan, without any writes to roll back
+            if not commit:
+                plan = self.plan(yaml_data, data.get('full_sync'))
+                plan.log(self)
+                uploaded_file.close()
+                return f"Planned changes: {plan.summary()}"
+
+            # Slugs for new objects are reserved in memory for the whole run
+            self.slugs = SlugReservations()
+
             # Process the site
             site_name = yaml_data['site']['name']
-            site, _ = Site.objects.get_or_create(name=site_name, defaults={'slug': slugify(Site, site_name)})
-            self.log_success(f"Processed site: {site.name}")
+            site, _ = Site.objects.get_or_create(name=site_name, defaults={'slug': self.slugs.lazy(Site, site_name)})
+            self.log_success(f"Processed site: {site.name}", category='site')
 
             # Process the location
             location_name = yaml_data['location']['name']
             location, _ = Location.objects.get_or_create(
                 name=location_name,
                 defaults={
-                    'slug': slugify(Location, location_name),
+                    'slug': self.slugs.lazy(Location, location_name),
                     'site': site,
                 }
             )
-            self.log_success(f"Processed location: {location.name}")
+            self.log_success(f"Processed location: {location.name}", category='site')
 
             # Ensure a default RIR exists or is created
             default_rir_name = "Private"  # Or any other name you prefer
             default_rir, _ = RIR.objects.get_or_create(
                 name=default_rir_name,
                 defaults={
-                    'slug': slugify(RIR, default_rir_name),
+                    'slug': self.slugs.lazy(RIR, default_rir_name),
                     'is_private': True  # Assuming the RIR is private, adjust as necessary
                 }
             )
-            self.log_success(f"Ensured RIR exists: {default_rir.name}")
+            self.log_success(f"Ensured RIR exists: {default_rir.name}", category='asn')
 
-            # Create the overlay ASN
+            existing_devices, changed_devices, fingerprints = self.select_changed_devices(yaml_data, data.get('full_sync'))
+            self.log_info(f"{len(changed_devices)} of {len(yaml_data['devices'])} devices changed since the last import.", category='device')
+
+            # Resolve all roles, device types, platforms and ASNs referenced by the YAML up front
             overlay_asn_number = yaml_data.get('overlay_asn', {}).get('number')
+            references = FabricReferenceResolver(
+                changed_devices,
+                default_rir,
+                extra_asns=[overlay_asn_number] if overlay_asn_number else [],
+            )
+            if references.missing:
+                raise AbortScript(f"Missing references in YAML file: {', '.join(references.missing)}")
+
+            for asn in references.create_missing_asns():
+                self.log_success(f"Created ASN {asn.asn}", category='asn')
+
+            # All object updates of this run are collected and written with one save per object
+            changes = PendingChanges()
+
+            # Create the overlay ASN
             if overlay_asn_number:
-                overlay_asn, _ = ASN.objects.get_or_create(asn=overlay_asn_number, rir=default_rir)
-                location.custom_field_data['Overlay_ASN'] = overlay_asn.id
-                location.save()
-                location.refresh_from_db()
-                self.log_success(f"Assigned Overlay ASN {overlay_asn_number} to location: {location.name}")
+                overlay_asn = references.asn(overlay_asn_number)
+                changes.set_custom_fields(location, Overlay_ASN=overlay_asn.id)
+                self.log_success(f"Assigned Overlay ASN {overlay_asn_number} to location: {location.name}", category='asn')
             else:
                 self.log_warning("Overlay ASN number is missing in the YAML file. Skipped setting Overlay ASN for the location.")
 
             # Process devices
-            for device_info in yaml_data['devices']:
-                role = DeviceRole.objects.get(name=device_info['role_name'])
-                # Use slug to fetch DeviceType
-                device_type = DeviceType.objects.get(slug=device_info['type_slug'])
-                platform = Platform.objects.get(slug=device_info['platform_slug'])
+            for device_info in changed_devices:
+                role, device_type, platform, asn = references.resolve(device_info)
                 asn_number = device_info['asn_number']
-                asn, _ = ASN.objects.get_or_create(asn=asn_number, rir=default_rir)
-
-                device, created = Device.objects.update_or_create(
-                    name=device_info['name'],
-                    defaults={
-                        'device_type': device_type,
-                        'device_role': role,
-                        'platform': platform,
-                        'site': site,
-                        'location': location,
-                    }
-                )
+                device_fields = {
+                    'device_type': device_type,
+                    'device_role': role,
+                    'platform': platform,
+                    'site': site,
+                    'location': location,
+                }
 
-                if created:
-                    self.log_success(f"Created device: {device.name}")
+                device = existing_devices.get(device_info['name'])
+                if device is None:
+                    device = Device(name=device_info['name'], **device_fields)
+                    device.custom_field_data['ASN'] = asn.id
+                    device.save()
+                    existing_devices[device.name] = device
+                    self.log_success(f"Created device: {device.name}", category='device')
                 else:
-                    self.log_info(f"Device {device.name} already exists.")
+                    changes.set(device, **device_fields)
+                    self.log_info(f"Device {device.name} already exists.", category='device')
+
+                # Process the management interface 'mgmt0' and the interfaces of the device in one batch
+                mgmt_interface_info = {
+                    'name': 'mgmt0',
+                    'type': '1000base-t',  # Adjust type as needed
+                    'ip_address': device_info['management_ip'],
+                }
+                ip_addresses = self.sync_device_interfaces(device, [mgmt_interface_info] + device_info.get('interfaces', []))
 
                 # Manage the management IP
-                mgmt_ip, _ = IPAddress.objects.get_or_create(address=device_info['management_ip'])
-
-                # Create or get the management interface 'mgmt0'
-                mgmt_interface, _ = Interface.objects.get_or_create(
-                    device=device,
-                    name='mgmt0',
-                    defaults={'type': '1000base-t'}  # Adjust type as needed
-                )
-
-                mgmt_interface.ip_addresses.add(mgmt_ip)
-                device.primary_ip4 = mgmt_ip
-                device.save()
-                self.log_success(f"Assigned management IP {mgmt_ip.address} to {device.name}")
+                mgmt_ip = ip_addresses[str(IPNetwork(device_info['management_ip']))]
+                if device.primary_ip4_id != mgmt_ip.pk:
+                    changes.set(device, primary_ip4=mgmt_ip)
+                    self.log_success(f"Assigned management IP {mgmt_ip.address} to {device.name}", category='ip address')
 
                 # Update device with ASN custom field
-                device.custom_field_data['ASN'] = asn.id
-                device.save()
-                self.log_success(f"Set ASN {asn_number} for device {device.name}")
-
-                # Process interfaces for the device
-                for interface_info in device_info.get('interfaces', []):
-                    interface_defaults = {}
-
-                    # Set interface type if provided
-                    if 'type' in interface_info and interface_info['type']:
-                        interface_defaults['type'] = interface_info['type']
-
-                    interface, created = Interface.objects.get_or_create(
-                        device=device,
-                        name=interface_info['name'],
-                        defaults=interface_defaults
-                    )
-
-                    # Assign IP to interface
-                    if 'ip_address' in interface_info:
-                        ip_address, ip_created = IPAddress.objects.get_or_create(address=interface_info['ip_address'])
-                        interface.ip_addresses.add(ip_address)
-                        if ip_created:
-                            self.log_success(f"Assigned IP {ip_address.address} to interface {interface.name} on device {device.name}")
-                        else:
-                            self.log_info(f"Interface {interface.name} on device {device.name} already had IP {ip_address.address}")
-
-                    if created:
-                        self.log_success(f"Created interface {interface.name} on device {device.name}")
-                    else:
-                        self.log_info(f"Interface {interface.name} on device {device.name} already exists.")
+                if device.custom_field_data.get('ASN') != asn.id:
+                    changes.set_custom_fields(device, ASN=asn.id)
+                    self.log_success(f"Set ASN {asn_number} for device {device.name}", category='asn')
 
                 for lag_info in device_info.get('lags', []):
                     # Create or get the LAG interface
@@ -236,12 +1303,10 @@ if not is_migrating:
                     )
 
                     # Handle Multihome custom fields for the LAG, if present
-                    if 'mh_id' in lag_info or 'mh_mode' in lag_info:
-                        if 'mh_id' in lag_info:
-                            lag_interface.custom_field_data['Iface_mh_id'] = lag_info['mh_id']
-                        if 'mh_mode' in lag_info:
-                            lag_interface.custom_field_data['Iface_mh_mode'] = lag_info['mh_mode']
-                        lag_interface.save()
+                    if 'mh_id' in lag_info:
+                        changes.set_custom_fields(lag_interface, Iface_mh_id=lag_info['mh_id'])
+                    if 'mh_mode' in lag_info:
+                        changes.set_custom_fields(lag_interface, Iface_mh_mode=lag_info['mh_mode'])
 
                     # Process member interfaces for this LAG
                     for member_info in lag_info.get('inteterfaces', []):
@@ -250,129 +1315,202 @@ if not is_migrating:
                             name=member_info['name'],
                         )
 
-                        member_interface.lag = lag_interface
-                        member_interface.save()
+                        changes.set(member_interface, lag=lag_interface)
 
                         # Log success/info
                         if member_created:
-                            self.log_success(f"Created and associated member interface {member_interface.name} with LAG {lag_interface.name}")
+                            self.log_success(f"Created and associated member interface {member_interface.name} with LAG {lag_interface.name}", category='lag')
                         else:
-                            self.log_info(f"Associated existing member interface {member_interface.name} with LAG {lag_interface.name}")
+                            self.log_info(f"Associated existing member interface {member_interface.name} with LAG {lag_interface.name}", category='lag')
 
                     if lag_created:
-                        self.log_success(f"Created LAG {lag_interface.name} on device {device.name}")
+                        self.log_success(f"Created LAG {lag_interface.name} on device {device.name}", category='lag')
                     else:
-                        self.log_info(f"LAG {lag_interface.name} on device {device.name} already exists.")
+                        self.log_info(f"LAG {lag_interface.name} on device {device.name} already exists.", category='lag')
+
+            # Write all collected device, location and LAG changes with one save per changed object
+            saved = changes.flush()
+            self.log_info(f"Saved {len(saved)} changed objects.", category='device')
 
             # Before processing links, ensure the "isl" tag exists
-            isl_tag, created = Tag.objects.get_or_create(name="isl", defaults={'slug': slugify(Tag, "isl")})
+            isl_tag, created = Tag.objects.get_or_create(name="isl", defaults={'slug': self.slugs.lazy(Tag, "isl")})
             if created:
-                self.log_success("Created 'isl' tag.")
+                self.log_success("Created 'isl' tag.", category='tag')
             else:
-                self.log_info("'isl' tag already exists.")
+                self.log_info("'isl' tag already exists.", category='tag')
 
             # Process interface links from the YAML
-            if 'links' in yaml_data:
-                for link in yaml_data['links']:
-                    device_a_name, interface_a_short = link['endpoints'][0].split(":")
-                    device_b_name, interface_b_short = link['endpoints'][1].split(":")
-
-                    self.log_info("Device A: {}, Interface A: {}".format(device_a_name, interface_a_short))
-                    self.log_info("Device B: {}, Interface B: {}".format(device_b_name, interface_b_short))
-
-                    interface_a_name = self.translate_interface_name(interface_a_short)
-                    interface_b_name = self.translate_interface_name(interface_b_short)
-
-                    # Fetch devices and interfaces from NetBox
-                    device_a = Device.objects.get(name=device_a_name)
-                    interface_a = Interface.objects.get(device=device_a, name=interface_a_name)
-
-                    device_b = Device.objects.get(name=device_b_name)
-                    interface_b = Interface.objects.get(device=device_b, name=interface_b_name)
-
-                    # Check if either interface already has a cable
-                    if interface_a.cable or interface_b.cable:
-                        self.log_info(f"One of the interfaces already has a cable: {device_a_name}:{interface_a_name} or {device_b_name}:{interface_b_name}")
-                    else:
-                        # Correct approach to create the cable between the two interfaces
-                        cable = Cable(a_terminations=[interface_a], b_terminations=[interface_b], status="connected")
-                        if commit:
-                            cable.save()
-                            self.log_success(f"Cable created between {device_a_name}:{interface_a_name} and {device_b_name}:{interface_b_name}")
-
-                            interface_a.refresh_from_db()
-                            interface_b.refresh_from_db()
-
-                            # Add the "isl" tag to both interfaces and save
-                            interface_a.tags.add(isl_tag)
-                            interface_a.save()
-                            interface_b.tags.add(isl_tag)
-                            interface_b.save()
-                            self.log_success(f"Added 'isl' tag to interfaces: {device_a_name}:{interface_a_name} and {device_b_name}:{interface_b_name}")
-                        else:
-                            self.log_info(f"Cable would be created between {device_a_name}:{interface_a_name} and {device_b_name}:{interface_b_name} upon commit")
+            # Only links terminating on a changed device need to be re-applied
+            changed_links = [
+                link for link in yaml_data.get('links', [])
+                if any(endpoint.split(":")[0] in fingerprints for endpoint in link['endpoints'][:2])
+            ]
+            missing_links = self.create_links(changed_links, isl_tag) if changed_links else []
+
+            # Record the fingerprints so unchanged devices are skipped by the next import. Devices on a
+            # link with a missing endpoint keep their old fingerprint, so the next import retries the link.
+            unresolved_devices = {device_name for endpoints in missing_links for device_name, _ in endpoints}
+            for device_info in changed_devices:
+                if device_info['name'] not in unresolved_devices:
+                    device = existing_devices[device_info['name']]
+                    changes.set_custom_fields(device, Intent_hash=fingerprints[device.name])
+            changes.flush()
 
             # Remember to close the uploaded file
             uploaded_file.close()
 
 
-    class BulkImportLAGsFromYAML(Script):
+    class BulkImportLAGsFromYAML(SummaryLogMixin, Script):
         class Meta:
             name = "Bulk Import LAGs"
             description = "Imports LAG configurations and their member interfaces from a YAML file."
-            field_order = ['yamlfile']
+            field_order = ['yamlfile', 'log_verbosity']
 
         yamlfile = FileVar(
             description="Upload YAML file containing LAG configurations",
         )
 
+        def plan(self, lags_data):
+            """
+            Computes the LAG and member changes the import would make from one snapshot of the
+            referenced devices and interfaces. Nothing is written to the database.
+            """
+            plan = ChangePlan()
+            lags = lags_data.get('lags', [])
+            device_names = {device_info['name'] for lag_info in lags for device_info in lag_info['devices']}
+            existing_devices = set(Device.objects.filter(name__in=device_names).values_list('name', flat=True))
+            interfaces = {
+                (interface.device.name, interface.name): interface
+                for interface in Interface.objects.filter(device__name__in=device_names).select_related('device')
+            }
+
+            for lag_info in lags:
+                for device_info in lag_info['devices']:
+                    device_name = device_info['name']
+                    if device_name not in existing_devices:
+                        plan.error(f"Device '{device_name}' does not exist")
+                        continue
+
+                    lag_fields = {
+                        'type': 'lag',
+                        'description': f"LAG Interface for {device_name}",
+                    }
+                    lag_custom_fields = {
+                        'Iface_mh_id': int(lag_info['mh_id']),
+                        'Iface_mh_mode': lag_info['mh_mode'],
+                    }
+                    lag_interface = interfaces.get((device_name, lag_info['name']))
+                    if lag_interface is None:
+                        plan.create(Interface, f"{device_name}:{lag_info['name']}", **lag_fields, **lag_custom_fields)
+                    else:
+                        lag_changes = changed_fields(lag_interface, **lag_fields)
+                        lag_changes.update({
+                            name: value for name, value in lag_custom_fields.items()
+                            if lag_interface.custom_field_data.get(name) != value
+                        })
+                        plan.update(Interface, f"{device_name}:{lag_info['name']}", **lag_changes)
+
+                    for interface_info in device_info['interfaces']:
+                        member_interface = interfaces.get((device_name, interface_info['name']))
+                        if member_interface is None:
+                            plan.error(f"Member interface '{interface_info['name']}' does not exist on device '{device_name}'")
+                        elif lag_interface is None or member_interface.lag_id != lag_interface.pk:
+                            plan.update(Interface, f"{device_name}:{interface_info['name']}", lag=lag_info['name'])
+
+            return plan
+
+        @summarised_log
         def run(self, data, commit):
             # Read and decode the YAML file content
             uploaded_file = data['yamlfile']
             yaml_content = uploaded_file.read().decode('utf-8')
             lags_data = yaml.safe_load(yaml_content)
 
-            # Process each LAG configuration
-            for lag_info in lags_data.get('lags', []):
-                self.process_lag(lag_info, commit)
-
-            uploaded_file.close()
+            # Dry runs only compute and report the plan, without any writes to roll back
+            if not commit:
+                plan = self.plan(lags_data)
+                plan.log(self)
+                uploaded_file.close()
+                return f"Planned changes: {plan.summary()}"
 
-        def process_lag(self, lag_info, commit):
-            for device_info in lag_info['devices']:
-                device = Device.objects.get(name=device_info['name'])
+            # Process all LAG configurations in one batch
+            self.import_lags(lags_data)
 
-                # Create or update the LAG interface for the device
-                lag_interface, lag_created = Interface.objects.update_or_create(
-                    device=device,
-                    name=lag_info['name'],
-                    defaults={'type': 'lag', 'description': f"LAG Interface for {device_info['name']}"}
-                )
-
-                # Apply Multihome custom fields to the LAG
-                lag_interface.custom_field_data['Iface_mh_id'] = int(lag_info['mh_id'])
-                lag_interface.custom_field_data['Iface_mh_mode'] = lag_info['mh_mode']
-                lag_interface.save()
+            uploaded_file.close()
 
-                self.log_success(f"Processed LAG '{lag_interface.name}' for device '{device.name}'")
+        def import_lags(self, lags_data):
+            """
+            Creates or updates every LAG of the YAML and attaches its members. The devices and all
+            referenced interfaces are resolved with one query each, new LAGs are bulk created and
+            all member assignments are written with a single bulk update. Missing devices and
+            member interfaces are reported together at the end.
+            """
+            lags = lags_data.get('lags', [])
+            device_names = {device_info['name'] for lag_info in lags for device_info in lag_info['devices']}
+            interface_names = {lag_info['name'] for lag_info in lags}
+            interface_names.update(
+                interface_info['name'] for lag_info in lags for device_info in lag_info['devices'] for interface_info in device_info['interfaces']
+            )
+            devices = {device.name: device for device in Device.objects.filter(name__in=device_names)}
+            interfaces = {
+                (interface.device.name, interface.name): interface
+                for interface in Interface.objects.filter(device__name__in=device_names, name__in=interface_names).select_related('device')
+            }
+            missing = [f"device '{device_name}'" for device_name in sorted(device_names - devices.keys())]
+
+            # Create or update the LAG interfaces first, so that the members can reference them
+            changes = PendingChanges()
+            new_lags = []
+            for lag_info in lags:
+                lag_fields = {'type': 'lag'}
+                lag_custom_fields = {'Iface_mh_id': int(lag_info['mh_id']), 'Iface_mh_mode': lag_info['mh_mode']}
+                for device_info in lag_info['devices']:
+                    device = devices.get(device_info['name'])
+                    if device is None:
+                        continue
+                    lag_interface = interfaces.get((device.name, lag_info['name']))
+                    description = f"LAG Interface for {device.name}"
+                    if lag_interface is None:
+                        lag_interface = Interface(device=device, name=lag_info['name'], description=description, **lag_fields)
+                        lag_interface.custom_field_data.update(lag_custom_fields)
+                        interfaces[(device.name, lag_info['name'])] = lag_interface
+                        new_lags.append(lag_interface)
+                    else:
+                        changes.set(lag_interface, description=description, **lag_fields)
+                        changes.set_custom_fields(lag_interface, **lag_custom_fields)
+                        self.log_success(f"Processed LAG '{lag_interface.name}' for device '{device.name}'", category='lag')
+
+            for lag_interface in Interface.objects.bulk_create(new_lags):
+                self.log_success(f"Created LAG '{lag_interface.name}' for device '{lag_interface.device.name}'", category='lag')
+            record_bulk_changes(new_lags)
+            changes.flush()
+
+            # Associate the member interfaces with their LAG
+            members = {}
+            for lag_info in lags:
+                for device_info in lag_info['devices']:
+                    device = devices.get(device_info['name'])
+                    if device is None:
+                        continue
+                    lag_interface = interfaces[(device.name, lag_info['name'])]
+                    for interface_info in device_info['interfaces']:
+                        member_interface = interfaces.get((device.name, interface_info['name']))
+                        if member_interface is None:
+                            missing.append(f"member interface '{interface_info['name']}' on device '{device.name}'")
+                            continue
+                        if member_interface.lag_id == lag_interface.pk:
+                            self.log_info(f"Member interface '{member_interface.name}' is already part of LAG '{lag_interface.name}' on device '{device.name}'", category='lag')
+                            continue
+                        member_interface.lag = lag_interface
+                        members[member_interface.pk] = member_interface
+                        self.log_success(f"Updated member interface '{member_interface.name}' and associated it with LAG '{lag_interface.name}' on device '{device.name}'", category='lag')
 
-                # Associate member interfaces with this LAG
-                for interface_info in device_info['interfaces']:
-                    self.associate_member_with_lag(device, lag_interface, interface_info['name'], commit)
+            if members:
+                Interface.objects.bulk_update(members.values(), ['lag'])
+                record_bulk_changes(members.values(), ObjectChangeActionChoices.ACTION_UPDATE)
 
-        def associate_member_with_lag(self, device, lag_interface, interface_name, commit):
-            # Create or update the member interface and associate it with the LAG
-            try:
-                member_interface = Interface.objects.get(
-                    device=device,
-                    name=interface_name,
-                )
-                member_interface.lag = lag_interface
-                if commit:
-                    member_interface.save()
-                self.log_success(f"Updated member interface '{member_interface.name}' and associated it with LAG '{lag_interface.name}' on device '{device.name}'")
-            except Interface.DoesNotExist:
-                self.log_warning(f"Member interface '{interface_name}' does not exist on device '{device.name}'")
+            if missing:
+                self.log_warning(f"{len(missing)} referenced objects do not exist: {', '.join(missing)}")
 
 
     class CreateLag(Script):
@@ -382,63 +1520,104 @@ if not is_migrating:
 
         # Form fields
         lag_id = IntegerVar(description="Lag ID", min_value=1)
-        mh_mode = ChoiceVar(choices=MH_mode_choices, description="Multihome Mode")
+        mh_mode = LazyChoiceVar(functools.partial(custom_field_choices, "MH_mode"), description="Multihome Mode")
         description = StringVar(description="Description", required=False)
         location = ObjectVar(model=Location, description="Location")
         device = ObjectVar(model=Device, description="Device", required=False, query_params={"location": "$location"})
         interfaces = MultiObjectVar(model=Interface, description="Member Interfaces", query_params={"device_id": "$device"})
+        additional_lags = TextVar(
+            description="Further Lags in the same location, one per line as '<Lag ID>: <device>:<interface>, <device>:<interface>, ...'",
+            required=False,
+        )
+
+        def parse_additional_lags(self, value, location):
+            """
+            Resolves the explicit member lists of the additional Lags with a single query.
+            Returns a Lag ID -> member interfaces map.
+            """
+            endpoints = {}
+            for line in (value or '').splitlines():
+                if not line.strip():
+                    continue
+                lag_id, separator, members = line.partition(':')
+                try:
+                    lag_id = int(lag_id)
+                except ValueError:
+                    raise AbortScript(f"Invalid Lag ID in line '{line}'.")
+                if not separator or lag_id < 1:
+                    raise AbortScript(f"Line '{line}' is not of the form '<Lag ID>: <device>:<interface>, ...'.")
+                for member in members.split(','):
+                    device_name, separator, interface_name = member.strip().partition(':')
+                    if not separator:
+                        raise AbortScript(f"Member '{member.strip()}' of Lag {lag_id} is not of the form '<device>:<interface>'.")
+                    endpoints.setdefault(lag_id, []).append((device_name, interface_name))
+
+            keys = {key for members in endpoints.values() for key in members}
+            interfaces = {
+                (interface.device.name, interface.name): interface
+                for interface in Interface.objects.filter(
+                    device__location=location,
+                    device__name__in={device_name for device_name, _ in keys},
+                    name__in={interface_name for _, interface_name in keys},
+                ).select_related('device')
+            }
+            missing = sorted(f"{device_name}:{interface_name}" for device_name, interface_name in keys - interfaces.keys())
+            if missing:
+                raise AbortScript(f"Interfaces not found in location '{location}': {', '.join(missing)}")
+            return {lag_id: [interfaces[key] for key in members] for lag_id, members in endpoints.items()}
 
         def run(self, data, commit):
-            lag_id = str(data['lag_id'])  # Ensure lag_id is treated as string for naming consistency
             mh_mode = data['mh_mode']
             description = data.get('description', '')
-            selected_interfaces = data['interfaces']
-
-            # Keep track of created or updated LAGs to avoid duplicates on the same device
-            processed_devices = set()
-
-            for interface in selected_interfaces:
-                device = interface.device
-
-                # Skip if this device's LAG has already been processed
-                if device in processed_devices:
-                    continue
 
+            # The selected interfaces form Lag lag_id, the additional Lags list their members explicitly
+            assignments = {data['lag_id']: list(data['interfaces'].select_related('device'))}
+            for lag_id, interfaces in self.parse_additional_lags(data.get('additional_lags'), data['location']).items():
+                assignments.setdefault(lag_id, []).extend(interfaces)
+            lag_of = {}
+            for lag_id, interfaces in assignments.items():
+                for interface in interfaces:
+                    if lag_of.setdefault(interface.pk, lag_id) != lag_id:
+                        raise AbortScript(f"Interface '{interface.name}' on device '{interface.device.name}' is assigned to Lag {lag_of[interface.pk]} and Lag {lag_id}.")
+
+            # Fetch the existing LAGs of all devices at once and keep a device -> LAG map
+            devices = {interface.device for interfaces in assignments.values() for interface in interfaces}
+            lags = {
+                (lag.device_id, lag.name): lag
+                for lag in Interface.objects.filter(device__in=devices, name__in=[f"lag{lag_id}" for lag_id in assignments])
+            }
+
+            # Create or update the LAG interfaces
+            changes = PendingChanges()
+            new_lags = []
+            for lag_id, interfaces in assignments.items():
                 lag_name = f"lag{lag_id}"
-
-                # Create or update the LAG interface
-                lag_interface, created = Interface.objects.update_or_create(
-                    name=lag_name,
-                    device=device,
-                    defaults={
-                        'type': 'lag',
-                        'description': description,
-                        # Additional LAG interface settings as needed
-                    }
-                )
-
-                # Set custom fields for the LAG interface
-                lag_interface.custom_field_data['Iface_mh_id'] = int(lag_id)
-                lag_interface.custom_field_data['Iface_mh_mode'] = mh_mode
-                if commit:
-                    lag_interface.save()
-                    self.log_success(f"{'Created' if created else 'Updated'} LAG '{lag_id}' on device '{device.name}'.")
-
-                processed_devices.add(device)
-
-            # Associate selected interfaces with their respective LAG
-            for interface in selected_interfaces:
-                # Retrieve or create the LAG interface for this interface's device
-                lag_interface = Interface.objects.get(
-                    name=f"lag{lag_id}",
-                    device=interface.device,
-                    type='lag'
-                )
-
-                interface.lag = lag_interface
-                if commit:
-                    interface.save()
+                lag_custom_fields = {'Iface_mh_id': lag_id, 'Iface_mh_mode': mh_mode}
+                for device in sorted({interface.device for interface in interfaces}, key=lambda device: device.name):
+                    lag_interface = lags.get((device.pk, lag_name))
+                    if lag_interface is None:
+                        lag_interface = Interface(device=device, name=lag_name, type='lag', description=description)
+                        lag_interface.custom_field_data.update(lag_custom_fields)
+                        lags[(device.pk, lag_name)] = lag_interface
+                        new_lags.append(lag_interface)
+                    else:
+                        changes.set(lag_interface, type='lag', description=description)
+                        changes.set_custom_fields(lag_interface, **lag_custom_fields)
+                        self.log_success(f"Updated LAG '{lag_id}' on device '{device.name}'.")
+            for lag_interface in Interface.objects.bulk_create(new_lags):
+                self.log_success(f"Created LAG '{lag_interface.custom_field_data['Iface_mh_id']}' on device '{lag_interface.device.name}'.")
+            record_bulk_changes(new_lags)
+            changes.flush()
+
+            # Associate selected interfaces with their respective LAG in one bulk update
+            members = []
+            for lag_id, interfaces in assignments.items():
+                for interface in interfaces:
+                    interface.lag = lags[(interface.device_id, f"lag{lag_id}")]
+                    members.append(interface)
                     self.log_success(f"Associated interface '{interface.name}' with LAG '{lag_id}' on device '{interface.device.name}'.")
+            Interface.objects.bulk_update(members, ['lag'])
+            record_bulk_changes(members, ObjectChangeActionChoices.ACTION_UPDATE)
 
             if commit:
                 self.log_success("All changes have been committed.")
@@ -447,43 +1626,43 @@ if not is_migrating:
                 return "LAG setup preview complete. No changes have been made."
 
 
-    class DeleteLag(Script):
+    class ListLags(Script):
         class Meta:
-            name = "Delete a MH Lag"
-            description = "Safely delete a selected multihome LAG and disassociate its member interfaces."
+            name = "List MH Lags"
+            description = "List the multihome LAGs, filtered by location and Multihome ID, one page at a time."
+            field_order = ['location', 'lag_mh_id', 'page', 'page_size']
 
-        @staticmethod
-        def generate_lags_description():
-            lags = Interface.objects.filter(type='lag').select_related('device', 'device__location')
+        location = ObjectVar(model=Location, description="Location", required=False)
+        lag_mh_id = IntegerVar(description="LAG Multihome ID", required=False)
+        page = IntegerVar(description="Page", default=1, min_value=1)
+        page_size = IntegerVar(description="LAGs per page", default=100, min_value=1, max_value=1000)
 
-            # Extract lags into a list of dictionaries for easier sorting
-            lags_list = []
-            for lag in lags:
-                mh_id = int(lag.custom_field_data.get('Iface_mh_id', 0))
+        def run(self, data, commit):
+            if data.get('lag_mh_id'):
+                lags = lags_by_mh_id(data['lag_mh_id'])
+            else:
+                lags = Interface.objects.filter(type='lag')
+            if data.get('location'):
+                lags = lags.filter(device__location=data['location'])
+
+            total = lags.count()
+            page_size = data['page_size']
+            pages = max(1, -(-total // page_size))
+            page = min(data['page'], pages)
+            offset = (page - 1) * page_size
+
+            lags = lags.select_related('device', 'device__location').order_by('custom_field_data__Iface_mh_id', 'device__name', '_name')
+            for lag in lags[offset:offset + page_size]:
                 location_name = lag.device.location.name if lag.device.location else 'Unknown Location'
-                lags_list.append({
-                    'mh_id': mh_id,
-                    'name': lag.name,
-                    'device': lag.device.name,
-                    'location': location_name
-                })
-
-            lags_list.sort(key=lambda x: x['mh_id'])
-
-            # Build the description string from the sorted list
-            lags_description = ""
-            for lag in lags_list:
-                lags_description += f"LAG ID: {lag['mh_id']}, Name: {lag['name']}, Device: {lag['device']}, Location: {lag['location']}\n"
+                self.log_info(f"LAG ID: {lag.custom_field_data.get('Iface_mh_id')}, Name: {lag.name}, Device: {lag.device.name}, Location: {location_name}")
 
-            return lags_description if lags_description else "No LAG interfaces found."
+            return f"Page {page} of {pages}, {total} LAG interfaces in total."
 
-        available_lags = generate_lags_description()
 
-        lags_info = TextVar(
-            description="Available LAGs",
-            required=False,
-            default=available_lags
-        )
+    class DeleteLag(Script):
+        class Meta:
+            name = "Delete a MH Lag"
+            description = "Safely delete selected multihome LAGs and disassociate their member interfaces."
 
         location = ObjectVar(
             model=Location,
@@ -491,54 +1670,55 @@ if not is_migrating:
             required=True,
         )
 
-        lag_mh_id = IntegerVar(
-            description="Enter the LAG Multihome ID (refer to the LAGs information above)",
-            required=True
+        lag = ObjectVar(
+            model=Interface,
+            description="LAG to delete, together with all LAGs sharing its Multihome ID in the location",
+            required=False,
+            query_params={"type": "lag", "location_id": "$location"},
+        )
+
+        lag_mh_ids = StringVar(
+            description="Or enter one or more LAG Multihome IDs, as a list or range such as 10,12-14 (see the 'List MH Lags' script)",
+            required=False
         )
 
         def run(self, data, commit):
             location = data['location']
-            mh_id = int(data['lag_mh_id'])
-
-            # Find all LAG interfaces within the specified location that match the mh_id.
-            lags_to_delete = Interface.objects.filter(
-                custom_field_data__Iface_mh_id=mh_id,
-                device__location=location,
-                type='lag'
-            )
-
-            if not lags_to_delete.exists():
-                return f"No LAG interfaces found with MH ID '{mh_id}' in the specified location."
-
-            deleted_lags_info = []  # Collect info about deleted LAGs for logging
+            if data.get('lag_mh_ids'):
+                mh_ids = parse_id_list(data['lag_mh_ids'])
+            elif data.get('lag') and data['lag'].custom_field_data.get('Iface_mh_id') is not None:
+                mh_ids = [int(data['lag'].custom_field_data['Iface_mh_id'])]
+            else:
+                raise AbortScript("Select a LAG with a Multihome ID or enter the Multihome IDs.")
+            mh_ids_str = ", ".join(str(mh_id) for mh_id in mh_ids)
 
-            for lag_interface in lags_to_delete:
-                # Collect member interfaces for this LAG
-                member_interfaces = Interface.objects.filter(lag=lag_interface)
+            # Find all LAG interfaces within the specified location that match the mh_ids.
+            lags_to_delete = list(lags_by_mh_id(mh_ids, location).select_related('device').order_by('device__name', '_name'))
 
-                # Disassociate any member interfaces from this LAG
-                for interface in member_interfaces:
-                    interface.lag = None
-                    if commit:
-                        interface.save()
-                        self.log_success(f"Disassociated member interface '{interface.name}' from LAG '{lag_interface.name}'.")
+            if not lags_to_delete:
+                return f"No LAG interfaces found with MH ID(s) {mh_ids_str} in the specified location."
 
-                # Delete the LAG interface
-                if commit:
-                    deleted_lags_info.append(f"'{lag_interface.name}' on device '{lag_interface.device.name}'")
-                    lag_interface.delete()
+            lags_info = ", ".join(f"'{lag.name}' on device '{lag.device.name}'" for lag in lags_to_delete)
+            member_interfaces = Interface.objects.filter(lag__in=lags_to_delete)
 
             if commit:
-                deleted_lags_str = ", ".join(deleted_lags_info)
-                self.log_success(f"Deleted LAGs: {deleted_lags_str}.")
-                return f"Successfully deleted LAGs: {deleted_lags_str} and disassociated all member interfaces."
+                # Disassociate all member interfaces with one update, then delete all LAGs together.
+                # The queryset delete sends post_delete per LAG; the update is recorded explicitly.
+                members = list(member_interfaces)
+                member_count = member_interfaces.update(lag=None)
+                for member in members:
+                    member.lag = None
+                record_bulk_changes(members, ObjectChangeActionChoices.ACTION_UPDATE)
+                Interface.objects.filter(pk__in=[lag.pk for lag in lags_to_delete]).delete()
+                self.log_success(f"Deleted {len(lags_to_delete)} LAGs with MH ID(s) {mh_ids_str} and disassociated {member_count} member interfaces: {lags_info}.")
+                return f"Successfully deleted LAGs: {lags_info} and disassociated all member interfaces."
             else:
                 # In a no-commit scenario, just log what would have happened
-                preview_info = ", ".join([f"'{lag.name}' on device '{lag.device.name}'" for lag in lags_to_delete])
-                return f"Would delete LAGs: {preview_info} and disassociate all member interfaces. No changes made due to dry run."
+                self.log_info(f"Would delete {len(lags_to_delete)} LAGs with MH ID(s) {mh_ids_str} and disassociate {member_interfaces.count()} member interfaces.")
+                return f"Would delete LAGs: {lags_info} and disassociate all member interfaces. No changes made due to dry run."
 
 
-    class CreateFabric(Script):
+    class CreateFabric(SummaryLogMixin, FabricAddressingMixin, Script):
         class Meta:
             name = "CreateFabric"
             description = "Automated Fabric Creation"
@@ -547,16 +1727,13 @@ if not is_migrating:
         def get_default_device_type(model_name):
             return DeviceType.objects.filter(model=model_name).first()
 
-        spine_model_default = DeviceType.objects.get(slug='nokia-7220-ixr-d2l-25-100ge')
-        leaf_model_default = DeviceType.objects.get(slug='nokia-7220-ixr-d3l-32-100ge')
-
         site_name = StringVar(description="Name of the site", default="Antwerp")
         location_name = StringVar(description="Name of the location", default="DC3")
         num_dcgws = IntegerVar(description="Number of dcgws", default=2)
         num_spines = IntegerVar(description="Number of spines", default=2)
-        spine_model = ObjectVar(model=DeviceType, description="Spine Model", default=spine_model_default)
+        spine_model = LazyObjectVar(model=DeviceType, description="Spine Model", default_loader=functools.partial(device_type_pk, 'nokia-7220-ixr-d2l-25-100ge'))
         num_leaves = IntegerVar(description="Number of leaves", default=3)
-        leaf_model = ObjectVar(model=DeviceType, description="Leaf Model", default=leaf_model_default)
+        leaf_model = LazyObjectVar(model=DeviceType, description="Leaf Model", default_loader=functools.partial(device_type_pk, 'nokia-7220-ixr-d3l-32-100ge'))
         management_ip_subnet = IPAddressWithMaskVar(
             description="Management IP Subnet",
             default="192.168.1.0/24"
@@ -573,160 +1750,89 @@ if not is_migrating:
             description="Range of ASNs",
             default="65001-65100"
         )
+        expand_only = BooleanVar(
+            description="Expansion mode: leave existing devices untouched and only allocate ASNs, IPs and links for new devices",
+            default=False
+        )
 
-        def get_free_asn(self, asn_range):
-            """Retrieve a free ASN within the specified ASNRange object."""
-            used_asns = ASN.objects.filter(asn__range=(asn_range.start, asn_range.end)).values_list('asn', flat=True)
-            for asn in range(asn_range.start, asn_range.end + 1):
-                if asn not in used_asns:
-                    return asn
-            raise ValueError("No free ASN available within the specified range.")
-
-        def assign_ip_address(self, device, interface_name, prefix):
+        def create_isl_links(self, leaves, spines, dcgws, isl_prefix, new_device_ids=None):
+            # The free Ethernet ports of all leaves and spines are loaded once
+            free_ports = FreePortIndex(leaves + spines).ports
+
+            # The leaf x spine and spine x DCGW links are laid out as index tables.
+            # Leaves use their last free ports towards the spines, spines their first free ports after
+            # the two reserved ones towards the leaves and their last free ports towards the DCGWs.
+            leaf_spine = link_table(leaves, spines, new_device_ids)
+            spine_dcgw = link_table(spines, dcgws, new_device_ids)
+
+            # Every device needs enough free ports for all of its links
+            needed = Counter()
+            for i, j, row, column, offset in leaf_spine:
+                needed[leaves[i].pk] = max(needed[leaves[i].pk], row + 1)
+                needed[spines[j].pk] = max(needed[spines[j].pk], column + 3)
+            spine_uplinks = Counter(spines[i].pk for i, j, row, column, offset in spine_dcgw)
+            short = {
+                device.pk for device in leaves + spines
+                if needed[device.pk] + spine_uplinks[device.pk] > len(free_ports[device.pk])
+            }
+            for device in leaves + spines:
+                if device.pk in short:
+                    self.log_failure(f"Not enough free ports on {device.name} for its {needed[device.pk] + spine_uplinks[device.pk]} fabric links.")
+
+            # Links are cabled in one batch at the end. The /31 offsets of the spine x DCGW table
+            # follow those of the leaf x spine table, so every link keeps its pair when others are skipped.
+            links = [
+                (free_ports[leaves[i].pk][-1 - row], free_ports[spines[j].pk][2 + column], offset)
+                for i, j, row, column, offset in leaf_spine
+                if leaves[i].pk not in short and spines[j].pk not in short
+            ]
+
+            # Ensure DCGW interfaces are generated; spine n connects to port 1/1/c<n>/1 of every DCGW
+            for j in sorted({j for i, j, row, column, offset in spine_dcgw}):
+                self.ensure_dcgw_interfaces(dcgws[j], len(spines))
+            dcgw_interfaces = {
+                (interface.device_id, interface.name): interface
+                for interface in Interface.objects.filter(device__in=dcgws, name__startswith='1/1/c').select_related('device')
+            }
+            links += [
+                (free_ports[spines[i].pk][-1 - row], dcgw_interfaces[(dcgws[j].pk, f"1/1/c{i + 1}/1")], len(leaf_spine) + offset)
+                for i, j, row, column, offset in spine_dcgw
+                if spines[i].pk not in short
+            ]
+
+            self.connect_links(links, isl_prefix, len(leaf_spine) + len(spine_dcgw))
+
+        def connect_links(self, links, isl_prefix, pair_count):
             """
-            Assign an IP address from the specified prefix to the specified interface of a device,
-            based on the prefix role. For management IPs, also set the IP as the primary IP for the device.
+            Cables a list of planned (interface_a, interface_b, offset) links in one pass. All endpoints
+            get the 'isl' tag through one bulk insert on the tag through table. pair_count /31 pairs are
+            allocated from the ISL prefix, each link takes the pair at its offset, and the addresses are
+            created with one bulk insert.
             """
-            # Generate a list of available IP addresses within the prefix
-            available_ips_list = list(prefix.get_available_ips())
-
-            if not available_ips_list:
-                self.log_failure(f"No available IP addresses in prefix {prefix} for {interface_name} on {device.name}.")
-                return None
-
-            # Determine the subnet mask
-            subnet_mask = '/32' if prefix.role.slug == 'system' else f"/{prefix.prefix.prefixlen}"
-            ip_address_str = f"{available_ips_list[0]}{subnet_mask}"
-
-            ip_obj, created = IPAddress.objects.get_or_create(
-                address=ip_address_str,
-                defaults={
-                    'status': 'active',
-                    'description': f"{prefix.role.name} IP for {device.name}",
-                }
-            )
-
-            # Retrieve or create the specified interface for the device
-            interface, interface_created = Interface.objects.get_or_create(
-                device=device,
-                name=interface_name,
-                defaults={'type': 'virtual' if prefix.role.slug == 'system' else '1000base-t'}
-            )
-
-            # Associate the IP with the interface and save
-            if prefix.role.slug != 'system':
-                # For non-system IPs, directly assign and save
-                ip_obj.assigned_object = interface
-                ip_obj.save()
-            else:
-                # For system IPs, add to the interface's IP list but not set as primary IP of the device
-                interface.ip_addresses.add(ip_obj)
-
-            action = "Assigned" if created else "Reassigned"
-            self.log_success(f"{action} {ip_obj.address} to {interface_name} on {device.name}.")
-
-            # Specifically handle the management IP: assign to interface and set as primary
-            if prefix.role.slug == 'management':
-                device.primary_ip4 = ip_obj
-                device.save()
-                self.log_success(f"Set {ip_obj.address} as primary management IP for {device.name}.")
-
-        def create_isl_links(self, leaves, spines, dcgws, isl_prefix):
-            # Helper function to get the last available Ethernet interfaces on a device
-            def get_last_available_interfaces(device, count):
-                eligible_interfaces = list(Interface.objects.filter(device=device, tagged_vlans=None, lag=None, cable=None).exclude(name__contains='.').exclude(type='virtual').exclude(name__contains='mgmt').exclude(type="lag").exclude(type='10gbase-x-sfpp').order_by('-_name'))
-
-                return eligible_interfaces[:count]
-
-            # Helper function to get the first available Ethernet interfaces on a device with an offset
-            #                                     spine, 1, 2
-            def get_first_available_interfaces(device, count, offset):
-                eligible_interfaces = list(Interface.objects.filter(device=device, tagged_vlans=None, lag=None, cable=None).exclude(name__contains='.').exclude(type='virtual').exclude(name__contains='mgmt').exclude(type="lag").exclude(type='10gbase-x-sfpp').order_by('_name'))
-
-                return eligible_interfaces[offset:offset+count]
-
-            def assign_isl_ip_addresses(interface_a, interface_b, isl_prefix):
-                # Convert the larger prefix into an IPNetwork object
-                isl_network = IPNetwork(isl_prefix.prefix)
-
-                # Iterate over all possible /31 subnets within the larger network
-                for subnet in isl_network.subnet(31):
-                    # Convert the subnet into a list of IPs and ensure there are exactly 2 (as expected in a /31 subnet)
-                    ips = list(subnet)
-                    if len(ips) != 2:
-                        continue
-
-                    ip_a, ip_b = str(ips[0]) + '/31', str(ips[1]) + '/31'
-
-                    # Check if both IP addresses are available
-                    if not IPAddress.objects.filter(address__in=[ip_a, ip_b]).exists():
-
-                        # Create or update the IPAddress objects
-                        ip_obj_a, created_a = IPAddress.objects.get_or_create(
-                            address=ip_a,
-                            defaults={
-                                'status': 'active',
-                                'description': f"ISL IP for {interface_a.device.name}",
-                            }
-                        )
-                        ip_obj_b, created_b = IPAddress.objects.get_or_create(
-                            address=ip_b,
-                            defaults={
-                                'status': 'active',
-                                'description': f"ISL IP for {interface_b.device.name}",
-                            }
-                        )
-
-                        # Assign the IPAddress objects to the interfaces
-                        interface_a.ip_addresses.add(ip_obj_a)
-                        interface_b.ip_addresses.add(ip_obj_b)
-
-                        # Log the assignment and exit the function as the IPs have been assigned
-                        self.log_success(f"Assigned IP addresses {ip_a} and {ip_b} to interfaces {interface_a.name} and {interface_b.name}.")
-                        return
-
-                # If this point is reached, no suitable /31 subnets were found
-                self.log_failure(f"No available /31 subnets found in ISL prefix {isl_prefix}.")
-
-            # Helper function to connect two interfaces
-            def connect_interfaces(interface_a, interface_b, isl_prefix):
-                c = Cable(a_terminations=[interface_a], b_terminations=[interface_b], status="connected")
-
-                interface_a.refresh_from_db()
-                interface_b.refresh_from_db()
-
-                isl_tag, created = Tag.objects.get_or_create(name="isl", slug="isl")
-
-                # Add the "isl" tag to both interfaces and save
-                interface_a.tags.add(isl_tag)
-                interface_a.save()
-                interface_b.tags.add(isl_tag)
-                interface_b.save()
-                c.save()
-
-                assign_isl_ip_addresses(interface_a, interface_b, isl_prefix)
-
-                self.log_success(f"Connected {interface_a.device.name}:{interface_a.name} to {interface_b.device.name}:{interface_b.name}")
-
-            # Connect Leaves to Spines
-            for i, leaf in enumerate(leaves, start=1):
-                leaf_interfaces = get_last_available_interfaces(leaf, len(spines))
-                for j, spine in enumerate(spines, start=1):
-                    spine_interfaces = get_first_available_interfaces(spine, 2, 2)
-                    spine_interface = get_first_available_interfaces(spine, 1, 2)[0]
-                    connect_interfaces(leaf_interfaces[j-1], spine_interface, isl_prefix)
-
-            # Ensure DCGW interfaces are generated
-            for dcgw in dcgws:
-                self.ensure_dcgw_interfaces(dcgw, len(spines))
-
-            # Connect Spines to DCGWs
-            for i, spine in enumerate(spines, start=1):
-                # Retrieve the last available interfaces on the spine for each DCGW connection
-                spine_interfaces = get_last_available_interfaces(spine, len(dcgws))
-                for j, dcgw in enumerate(dcgws, start=1):
-                    dcgw_interface = Interface.objects.get(device=dcgw, name=f"1/1/c{i}/1")
-                    connect_interfaces(spine_interfaces[j-1], dcgw_interface, isl_prefix)
+            if not links:
+                return
+
+            for interface_a, interface_b, offset in links:
+                Cable(a_terminations=[interface_a], b_terminations=[interface_b], status="connected").save()
+                self.log_success(f"Connected {interface_a.device.name}:{interface_a.name} to {interface_b.device.name}:{interface_b.name}", category='cable')
+
+            # Add the "isl" tag to all endpoints
+            isl_tag, created = Tag.objects.get_or_create(name="isl", slug="isl")
+            bulk_tag([interface for interface_a, interface_b, offset in links for interface in (interface_a, interface_b)], isl_tag)
+
+            # The used ISL addresses are loaded once and the free /31 pairs for the whole table are handed out at once
+            pairs = ISLPairAllocator(isl_prefix).allocate(pair_count)
+            addressed = [(interface_a, interface_b, pairs[offset]) for interface_a, interface_b, offset in links if offset < len(pairs)]
+            if len(addressed) < len(links):
+                self.log_failure(f"No available /31 subnets found in ISL prefix {isl_prefix} for {len(links) - len(addressed)} links.")
+
+            record_bulk_changes(IPAddress.objects.bulk_create([
+                IPAddress(address=ip, status='active', description=f"ISL IP for {interface.device.name}", assigned_object=interface)
+                for interface_a, interface_b, pair in addressed
+                for interface, ip in zip((interface_a, interface_b), pair)
+            ]))
+            for interface_a, interface_b, (ip_a, ip_b) in addressed:
+                self.log_success(f"Assigned IP addresses {ip_a} and {ip_b} to interfaces {interface_a.name} and {interface_b.name}.", category='ip address')
 
         def ensure_dcgw_interfaces(self, dcgw, count):
             # Check existing count and create additional interfaces if needed
@@ -742,8 +1848,10 @@ if not is_migrating:
                     type="100gbase-x-cfp4"
                 )
 
+        @summarised_log
         def run(self, data, commit):
             # Basic validations and setup
+            self.slugs = SlugReservations()
             site_name = data.get('site_name', 'test')
             location_name = data.get('location_name', 'dc3')
             num_dcgws = data.get('num_dcgws', 0)
@@ -755,19 +1863,20 @@ if not is_migrating:
             system_ip_subnet = data.get('system_ip_subnet')
             isl_network_subnet = data.get('isl_network_subnet')
             asn_range = data.get('asn_range')
+            expand_only = data.get('expand_only', False)
 
             # Create or get the site, location and tenant
-            site, _ = Site.objects.get_or_create(name=site_name, defaults={'slug': slugify(Site, site_name)})
-            self.log_success(f"Site {site_name} created or retrieved successfully.")
+            site, _ = Site.objects.get_or_create(name=site_name, defaults={'slug': self.slugs.lazy(Site, site_name)})
+            self.log_success(f"Site {site_name} created or retrieved successfully.", category='site')
 
             location, _ = Location.objects.get_or_create(
                 name=location_name,
                 defaults={
-                    'slug': slugify(Location, location_name),
+                    'slug': self.slugs.lazy(Location, location_name),
                     'site': site,
                 }
             )
-            self.log_success(f"Location {location_name} created or retrieved successfully.")
+            self.log_success(f"Location {location_name} created or retrieved successfully.", category='site')
 
             # tenant, _ = Tenant.objects.get_or_create(name=site_name, slug=slugify(Site, site_name))
             # self.log_success(f"Tenant {site_name} created or retrieved successfully.")
@@ -781,7 +1890,7 @@ if not is_migrating:
             management_prefix, _ = Prefix.objects.get_or_create(prefix=management_ip_subnet, site=site, role=management_prefix_role)
             system_prefix, _ = Prefix.objects.get_or_create(prefix=system_ip_subnet, site=site, role=system_prefix_role)
             isl_prefix, _ = Prefix.objects.get_or_create(prefix=isl_network_subnet, site=site, role=isl_prefix_role)
-            self.log_success("IP Subnets for Management, System, and ISL created or retrieved successfully.")
+            self.log_success("IP Subnets for Management, System, and ISL created or retrieved successfully.", category='prefix')
 
             # Create ASNs from user range
             asn_start, asn_end = [int(asn) for asn in asn_range.split('-')]
@@ -792,30 +1901,57 @@ if not is_migrating:
             # Adjusted to create an ASNRange with required fields
             asn_range_obj, created = ASNRange.objects.get_or_create(
                 name=f"{site_name}_asn_range",
-                slug=slugify(ASNRange, f"{site_name}_asn_range"),
                 start=asn_start,
                 end=asn_end,
                 rir=rir,
+                defaults={'slug': self.slugs.lazy(ASNRange, f"{site_name}_asn_range")},
                 # tenant=tenant,
             )
             if created:
-                self.log_success(f"ASN range {asn_range_obj.range_as_string()} created successfully under RIR {rir.name}.")
+                self.log_success(f"ASN range {asn_range_obj.range_as_string()} created successfully under RIR {rir.name}.", category='asn')
             else:
-                self.log_info(f"Using existing ASN range {asn_range_obj.range_as_string()}.")
+                self.log_info(f"Using existing ASN range {asn_range_obj.range_as_string()}.", category='asn')
 
             # Device roles
             spine_role, _ = DeviceRole.objects.get_or_create(name="spine", slug="spine")
             leaf_role, _ = DeviceRole.objects.get_or_create(name="leaf", slug="leaf")
             dcgw_role, _ = DeviceRole.objects.get_or_create(name="dcgw", slug="dcgw")
-            self.log_success("Device roles for Spine, Leaf, and DCGW created or retrieved successfully.")
+            self.log_success("Device roles for Spine, Leaf, and DCGW created or retrieved successfully.", category='device')
+
+            # Work out which devices of the fabric are new. In expansion mode the existing devices
+            # are left untouched and only the new ones get ASNs, addresses and links.
+            spine_names = [f"{site.name}-spine-{i}" for i in range(1, num_spines + 1)]
+            leaf_names = [f"{site.name}-leaf-{i}" for i in range(1, num_leaves + 1)]
+            dcgw_names = [f"{site.name}-dcgw-{i}" for i in range(1, num_dcgws + 1)]
+            existing_devices = {}
+            if expand_only:
+                existing_devices = {device.name: device for device in Device.objects.filter(site=site)}
+                self.log_info(f"Expansion mode: {len(existing_devices)} existing devices in site {site.name} are left unchanged.", category='device')
+
+            # All spines share one ASN, which an expansion keeps using
+            spine_asn_id = next((existing_devices[name].custom_field_data.get('ASN') for name in spine_names if name in existing_devices), None)
+
+            # Reserve the ASNs for this build in one pass over the range and create them in bulk:
+            # one ASN shared by all spines and an individual ASN per new leaf and DCGW
+            asn_allocator = ASNAllocator(asn_range_obj)
+            spine_asn_values = [] if spine_asn_id else asn_allocator.allocate()
+            leaf_asn_values = asn_allocator.allocate(len([name for name in leaf_names if name not in existing_devices]))
+            dcgw_asn_values = asn_allocator.allocate(len([name for name in dcgw_names if name not in existing_devices]))
+            asns = {asn.asn: asn for asn in ASN.objects.bulk_create(
+                [ASN(asn=asn_value, rir=rir, description=f"{site_name} Spines") for asn_value in spine_asn_values]
+                + [ASN(asn=asn_value, rir=rir, description=f"{site_name} Leaf") for asn_value in leaf_asn_values]
+                + [ASN(asn=asn_value, rir=rir, description=f"{site_name} DCGW") for asn_value in dcgw_asn_values]
+            )}
+            record_bulk_changes(asns.values())
 
             # Create devices (spines) with the same ASN (all spines get the same ASN) (ASN is a custom field at device )
-            spine_asn_value = self.get_free_asn(asn_range_obj)
-            spine_asn, _ = ASN.objects.get_or_create(asn=spine_asn_value, rir=rir, defaults={'description': f"{site_name} Spines"})
+            spine_asn = asns[spine_asn_values[0]] if spine_asn_values else ASN.objects.get(pk=spine_asn_id)
             spine_devices = []
 
-            for i in range(1, num_spines + 1):
-                spine_name = f"{site.name}-spine-{i}"
+            for spine_name in spine_names:
+                if spine_name in existing_devices:
+                    spine_devices.append(existing_devices[spine_name])
+                    continue
                 spine, created = Device.objects.get_or_create(
                     name=spine_name,
                     defaults={
@@ -827,16 +1963,19 @@ if not is_migrating:
                 )
                 spine.custom_field_data['ASN'] = spine_asn.id  # Store ASN value
                 spine.save()
-                self.log_success(f"Spine {spine_name} created with ASN {spine_asn_value}.")
+                self.log_success(f"Spine {spine_name} created with ASN {spine_asn.asn}.", category='device')
                 spine_devices.append(spine)
 
             # Create devices (leaves) with individual ASNs
-                leaf_devices = []
-            for i in range(1, num_leaves + 1):
-                leaf_asn_value = self.get_free_asn(asn_range_obj)
-                leaf_asn, _ = ASN.objects.get_or_create(asn=leaf_asn_value, rir=rir, defaults={'description': f"{site_name} Leaf"})
+            leaf_devices = []
+            new_leaf_asn_values = iter(leaf_asn_values)
+            for leaf_name in leaf_names:
+                if leaf_name in existing_devices:
+                    leaf_devices.append(existing_devices[leaf_name])
+                    continue
+                leaf_asn_value = next(new_leaf_asn_values)
+                leaf_asn = asns[leaf_asn_value]
 
-                leaf_name = f"{site.name}-leaf-{i}"
                 leaf, created = Device.objects.get_or_create(
                     name=leaf_name,
                     defaults={
@@ -848,21 +1987,24 @@ if not is_migrating:
                 )
                 leaf.custom_field_data['ASN'] = leaf_asn.id
                 leaf.save()
-                self.log_success(f"Leaf {leaf_name} created with ASN {leaf_asn_value}.")
+                self.log_success(f"Leaf {leaf_name} created with ASN {leaf_asn_value}.", category='device')
                 leaf_devices.append(leaf)
 
             # Create devices (dcgws) with individual ASNs
             dcgw_devices = []
-            for i in range(1, num_dcgws + 1):
-                dcgw_asn_value = self.get_free_asn(asn_range_obj)
-                dcgw_asn, _ = ASN.objects.get_or_create(asn=dcgw_asn_value, rir=rir, defaults={'description': f"{site_name} DCGW"})
+            new_dcgw_asn_values = iter(dcgw_asn_values)
+            for dcgw_name in dcgw_names:
+                if dcgw_name in existing_devices:
+                    dcgw_devices.append(existing_devices[dcgw_name])
+                    continue
+                dcgw_asn_value = next(new_dcgw_asn_values)
+                dcgw_asn = asns[dcgw_asn_value]
 
                 try:
                     dcgw_model = DeviceType.objects.get(slug='nokia-7750-sr-1')
                 except DeviceType.DoesNotExist:
                     raise AbortScript("Cant't find devicetype with slug nokia-7750-sr-1!")
 
-                dcgw_name = f"{site.name}-dcgw-{i}"
                 dcgw, created = Device.objects.get_or_create(
                     name=dcgw_name,
                     defaults={
@@ -874,30 +2016,139 @@ if not is_migrating:
                 )
                 dcgw.custom_field_data['ASN'] = dcgw_asn.id
                 dcgw.save()
-                self.log_success(f"DCGW {dcgw_name} created with ASN {dcgw_asn_value}.")
+                self.log_success(f"DCGW {dcgw_name} created with ASN {dcgw_asn_value}.", category='device')
                 dcgw_devices.append(dcgw)
 
-            # Create a system0 interfaces (virtual) on all devices
-            devices = Device.objects.filter(site=site)
-            for device in devices:
-                # Create or get the system0 interface for each device
-                system0_interface, created = Interface.objects.get_or_create(
-                    device=device,
-                    name="system0",
-                    type="virtual",
-                )
-                if created:
-                    self.log_success(f"Created system0 interface for device {device.name}.")
-
-                self.assign_ip_address(device, "mgmt0", management_prefix)
-                self.assign_ip_address(device, "system0", system_prefix)
+            # Assign management and system IPs on all devices, creating the system0 interfaces (virtual) as needed.
+            # The free space of each prefix is computed once and consumed by all devices.
+            # In expansion mode only the new devices are addressed.
+            devices = [device for device in Device.objects.filter(site=site) if device.name not in existing_devices]
+            if devices:
+                self.assign_ip_addresses(devices, "mgmt0", PrefixIPAllocator(management_prefix))
+                self.assign_ip_addresses(devices, "system0", PrefixIPAllocator(system_prefix))
 
-            # Create ISL links between spines, leaves, and dcgws
-            self.create_isl_links(leaf_devices, spine_devices, dcgw_devices, isl_prefix)
+            # Create ISL links between spines, leaves, and dcgws; in expansion mode only the links of new devices
+            new_device_ids = {device.pk for device in devices} if expand_only else None
+            self.create_isl_links(leaf_devices, spine_devices, dcgw_devices, isl_prefix, new_device_ids)
 
             return "Fabric creation process completed."
 
 
+    class CreateClosFabric(SummaryLogMixin, FabricAddressingMixin, Script):
+        class Meta:
+            name = "CreateClosFabric"
+            description = "Plan and create a multi-pod 3- or 5-stage Clos fabric"
+            field_order = [
+                'site_name', 'location_name', 'pods', 'leaves_per_pod', 'planes', 'superspines_per_plane', 'border_leaves',
+                'leaf_model', 'spine_model', 'superspine_model', 'borderleaf_model',
+                'management_ip_subnet', 'system_ip_subnet', 'isl_network_subnet', 'asn_range', 'log_verbosity',
+            ]
+
+        site_name = StringVar(description="Name of the site", default="Antwerp")
+        location_name = StringVar(description="Name of the location", default="DC3")
+        pods = IntegerVar(description="Number of pods", default=1, min_value=1)
+        leaves_per_pod = IntegerVar(description="Number of leaves per pod", default=4, min_value=1)
+        planes = IntegerVar(description="Number of planes (spines per pod)", default=2, min_value=1)
+        superspines_per_plane = IntegerVar(description="Number of superspines per plane, 0 builds a 3-stage leaf/spine fabric", default=0, min_value=0)
+        border_leaves = IntegerVar(description="Number of border leaves", default=0, min_value=0)
+        leaf_model = ObjectVar(model=DeviceType, description="Leaf Model")
+        spine_model = ObjectVar(model=DeviceType, description="Spine Model")
+        superspine_model = ObjectVar(model=DeviceType, description="Superspine Model, defaults to the spine model", required=False)
+        borderleaf_model = ObjectVar(model=DeviceType, description="Border Leaf Model, defaults to the leaf model", required=False)
+        management_ip_subnet = IPAddressWithMaskVar(
+            description="Management IP Subnet",
+            default="192.168.1.0/24"
+        )
+        system_ip_subnet = IPAddressWithMaskVar(
+            description="System IP Subnet",
+            default="10.0.0.0/24"
+        )
+        isl_network_subnet = IPAddressWithMaskVar(
+            description="Subnet for the ISL Links",
+            default="172.16.0.0/24"
+        )
+        asn_range = StringVar(
+            description="Range of ASNs",
+            default="65001-65100"
+        )
+
+        @summarised_log
+        def run(self, data, commit):
+            site_name = data['site_name']
+            location_name = data['location_name']
+            asn_start, asn_end = [int(asn) for asn in data['asn_range'].split('-')]
+            device_types = {
+                'leaf': data['leaf_model'],
+                'spine': data['spine_model'],
+                'superspine': data.get('superspine_model') or data['spine_model'],
+                'borderleaf': data.get('borderleaf_model') or data['leaf_model'],
+            }
+
+            # Plan the whole fabric in memory from a read-only view of the used ASNs and ISL addresses
+            planner = ClosTopologyPlanner(
+                site_name,
+                data['pods'],
+                data['leaves_per_pod'],
+                data['planes'],
+                data['superspines_per_plane'],
+                data['border_leaves'],
+                device_types,
+            )
+            planner.plan(ASNAllocator(ASNRange(start=asn_start, end=asn_end)), ISLPairAllocator(Prefix(prefix=data['isl_network_subnet'])))
+            planner.validate()
+            self.log_info(f"Planned {len(planner.devices)} devices and {len(planner.links)} links.")
+
+            # Dry runs only report the plan
+            if not commit:
+                plan = planner.change_plan()
+                plan.log(self)
+                return f"Planned changes: {plan.summary()}"
+
+            if planner.errors:
+                for message in planner.errors:
+                    self.log_failure(message)
+                raise AbortScript(f"The planned fabric is invalid: {len(planner.errors)} errors.")
+
+            # Create or get the site, location, prefixes and ASN range
+            self.slugs = SlugReservations()
+            site, _ = Site.objects.get_or_create(name=site_name, defaults={'slug': self.slugs.lazy(Site, site_name)})
+            location, _ = Location.objects.get_or_create(
+                name=location_name,
+                defaults={
+                    'slug': self.slugs.lazy(Location, location_name),
+                    'site': site,
+                }
+            )
+            self.log_success(f"Site {site_name} and location {location_name} created or retrieved successfully.", category='site')
+
+            management_prefix_role, _ = Role.objects.get_or_create(name='Management', slug='management')
+            system_prefix_role, _ = Role.objects.get_or_create(name='System', slug='system')
+            isl_prefix_role, _ = Role.objects.get_or_create(name='ISL', slug='isl')
+            management_prefix, _ = Prefix.objects.get_or_create(prefix=data['management_ip_subnet'], site=site, role=management_prefix_role)
+            system_prefix, _ = Prefix.objects.get_or_create(prefix=data['system_ip_subnet'], site=site, role=system_prefix_role)
+            Prefix.objects.get_or_create(prefix=data['isl_network_subnet'], site=site, role=isl_prefix_role)
+            self.log_success("IP Subnets for Management, System, and ISL created or retrieved successfully.", category='prefix')
+
+            rir, _ = RIR.objects.get_or_create(name='Private', slug='private')
+            ASNRange.objects.get_or_create(
+                name=f"{site_name}_asn_range",
+                start=asn_start,
+                end=asn_end,
+                rir=rir,
+                defaults={'slug': self.slugs.lazy(ASNRange, f"{site_name}_asn_range")},
+            )
+            for role in planner.required_roles():
+                DeviceRole.objects.get_or_create(name=role, slug=role)
+
+            # Persist the planned graph in bulk, then address all new devices
+            isl_tag, _ = Tag.objects.get_or_create(name="isl", slug="isl")
+            devices = planner.persist(self, site, location, rir, isl_tag)
+            self.assign_ip_addresses(devices, "mgmt0", PrefixIPAllocator(management_prefix))
+            self.assign_ip_addresses(devices, "system0", PrefixIPAllocator(system_prefix))
+
+            return "Clos fabric creation process completed."
+
+
     # class DeleteFabric(Script):
     #     class Meta:
     #         name = "Delete a Nokia fabric"
@@ -918,4 +2169,4 @@ if not is_migrating:
 
 
     # script_order = (ImportFabricFromYAML, CreateFabric, DeleteFabric, BulkImportLAGsFromYAML, CreateLag, DeleteLag)
-    script_order = (ImportFabricFromYAML, CreateFabric, BulkImportLAGsFromYAML, CreateLag, DeleteLag)
+    script_order = (ImportFabricFromYAML, CreateFabric, CreateClosFabric, BulkImportLAGsFromYAML, CreateLag, ListLags, DeleteLag)
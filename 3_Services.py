@@ -14,7 +14,10 @@ if not is_migrating:
     import yaml
     import re
     import random
+    import functools
     import itertools
+    import time
+    from collections import Counter, defaultdict, namedtuple
     from extras.scripts import (
         AbortScript,
         ChoiceVar,
@@ -27,10 +30,16 @@ if not is_migrating:
         StringVar,
     )
     from ipam.models import RouteTarget
+    from extras.choices import ObjectChangeActionChoices
     from extras.models import (
         CustomFieldChoiceSet,
+        ObjectChange,
         Tag,
+        TaggedItem,
     )
+    from netbox.context import current_request
+    from netbox.search.backends import search_backend
+    from django.contrib.contenttypes.models import ContentType
     try:
         from ipam.models import L2VPN
     except ImportError:
@@ -45,45 +54,249 @@ if not is_migrating:
         IPAddress,
         VRF,
     )
+    from django.db import models
     from django.utils.text import slugify as django_slugify
     from contextlib import suppress
 
 
     # From: https://github.com/netbox-community/netbox/discussions/12315#discussioncomment-5685891
-    def slugify(model, name, chars=50):
-        base = str(name)
-        base = re.sub(r'[^-.\w\s]', '', base)        # Remove unneeded chars
-        base = re.sub(r'^[\s.]+|[\s.]+$', '', base)  # Trim leading/trailing spaces
-        base = re.sub(r'[-.\s]+', '-', base)         # Convert spaces and decimals to hyphens
-        base = base.lower()                          # Convert to lowercase
-        slug = base[0:chars]                         # Trim to first chars
-        for i in range(5):
-            if model.objects.filter(slug=slug).count() > 0:
-                slug = "%s-%06x" % (base[0:chars-7], random.randrange(0, 0x1000000))
+    class SlugReservations:
+        """
+        Hands out unique slugs for one run. The existing slugs of a model are loaded into a set once,
+        on first use, and every slug handed out is reserved in memory, so names within a batch never
+        collide and no query is issued per name. The set is loaded inside the script's transaction;
+        a slug taken concurrently after that is rejected by the unique constraint on the slug field.
+        """
+
+        def __init__(self):
+            self.used = {}
+
+        def reserve(self, model, name, chars=50):
+            base = str(name)
+            base = re.sub(r'[^-.\w\s]', '', base)        # Remove unneeded chars
+            base = re.sub(r'^[\s.]+|[\s.]+$', '', base)  # Trim leading/trailing spaces
+            base = re.sub(r'[-.\s]+', '-', base)         # Convert spaces and decimals to hyphens
+            base = base.lower()                          # Convert to lowercase
+            slug = base[0:chars]                         # Trim to first chars
+            if model not in self.used:
+                self.used[model] = set(model.objects.values_list('slug', flat=True))
+            used = self.used[model]
+            for i in range(5):
+                if slug in used:
+                    slug = "%s-%06x" % (base[0:chars-7], random.randrange(0, 0x1000000))
+                else:
+                    used.add(slug)
+                    return slug
+            else:
+                raise AbortScript("It's not your lucky day - unable to create a unique slug")
+
+        def lazy(self, model, name):
+            """Returns a callable for get_or_create defaults, so that a slug is only reserved for new objects."""
+            return functools.partial(self.reserve, model, name)
+
+
+    def record_bulk_changes(objects, action=ObjectChangeActionChoices.ACTION_CREATE):
+        """
+        bulk_create, bulk_update and queryset updates bypass the post_save handlers that write NetBox's
+        changelog and search cache. This writes the ObjectChange rows of the given objects with one bulk
+        insert, attributed to the user and request of the running script, and re-caches the objects in
+        the search backend.
+        """
+        objects = list(objects)
+        if not objects:
+            return
+        request = current_request.get()
+        object_changes = []
+        for obj in objects:
+            object_change = obj.to_objectchange(action)
+            if request is not None:
+                object_change.user = request.user
+                object_change.user_name = request.user.username
+                object_change.request_id = request.id
+            object_changes.append(object_change)
+        ObjectChange.objects.bulk_create(object_changes)
+        search_backend.cache(objects)
+
+
+    def changed_fields(obj, **fields):
+        """Returns the subset of fields whose value differs from the current value on obj."""
+        changed = {}
+        for name, value in fields.items():
+            if isinstance(value, models.Model) or (value is None and hasattr(obj, f"{name}_id")):
+                current, new = getattr(obj, f"{name}_id"), value.pk if value is not None else None
             else:
-                return slug
-        else:
-            raise AbortScript("It's not your lucky day - unable to create a unique slug")
+                current, new = getattr(obj, name), value
+            if current != new or new is None and isinstance(value, models.Model):
+                changed[name] = value
+        return changed
 
 
-    commissioning_state_choices = []
-    try:
-        commissioning_state_choices = CustomFieldChoiceSet.objects.get(name="Service_commissioning_state").choices
-    except CustomFieldChoiceSet.DoesNotExist:
-        pass
+    PlannedChange = namedtuple('PlannedChange', ['action', 'model', 'key', 'fields'])
+
+
+    class ChangePlan:
+        """
+        A typed list of the create, update and delete operations an import would perform.
+        Plans are computed from a snapshot read of the current state without any writes.
+        """
+
+        def __init__(self):
+            self.changes = []
+            self.errors = []
+
+        def create(self, model, key, **fields):
+            self.changes.append(PlannedChange('create', model, key, fields))
+
+        def update(self, model, key, **fields):
+            if fields:
+                self.changes.append(PlannedChange('update', model, key, fields))
+
+        def delete(self, model, key):
+            self.changes.append(PlannedChange('delete', model, key, {}))
+
+        def error(self, message):
+            self.errors.append(message)
+
+        def summary(self):
+            counts = Counter((change.action, change.model._meta.verbose_name_plural) for change in self.changes)
+            summary = ", ".join(f"{action} {count} {name}" for (action, name), count in sorted(counts.items()))
+            return summary or "no changes"
+
+        def log(self, script):
+            for change in self.changes:
+                fields = ", ".join(f"{name}={value}" for name, value in change.fields.items())
+                script.log_info(
+                    f"Would {change.action} {change.model._meta.verbose_name} '{change.key}'{': ' + fields if fields else ''}",
+                    category=change.model._meta.verbose_name_plural,
+                    full=True,
+                )
+            for message in self.errors:
+                script.log_failure(message)
+            script.log_success(f"Planned changes: {self.summary()}. No changes have been made.")
+
+
+    LOG_VERBOSITY_CHOICES = (
+        ('summary', 'Summary'),
+        ('full', 'Full'),
+    )
+
+
+    def summarised_log(run):
+        """Decorator for Script.run that writes the aggregated job log summary once the run ends."""
+        @functools.wraps(run)
+        def wrapper(self, data, commit):
+            self.log_verbosity_level = data.get('log_verbosity') or 'summary'
+            try:
+                return run(self, data, commit)
+            finally:
+                self.log_summary()
+        return wrapper
+
+
+    class SummaryLogMixin:
+        """
+        Keeps per-category counters and a capped sample of success and info messages instead of
+        writing one job log entry per touched object. Warnings, failures and messages logged with
+        full=True, such as the entries of a dry run plan, are always logged in full.
+        """
+        log_sample_size = 25
+
+        log_verbosity = ChoiceVar(
+            choices=LOG_VERBOSITY_CHOICES,
+            default='summary',
+            description="Summary logs counters and a sample of messages, full logs every message",
+            required=False,
+        )
 
-    class L2VPNsBulkImport(Script):
+        def _aggregate(self, level, category):
+            """Counts the message and returns True if it should be left out of the job log."""
+            if getattr(self, 'log_verbosity_level', 'full') == 'full':
+                return False
+            if not hasattr(self, 'log_counters'):
+                self.log_counters = Counter()
+                self.log_sampled = Counter()
+            category = category or 'other'
+            self.log_counters[(category, level)] += 1
+            if self.log_sampled[category] < self.log_sample_size:
+                self.log_sampled[category] += 1
+                return False
+            return True
+
+        def log_success(self, message, *args, category=None, full=False, **kwargs):
+            if full or not self._aggregate('success', category):
+                super().log_success(message, *args, **kwargs)
+
+        def log_info(self, message, *args, category=None, full=False, **kwargs):
+            if full or not self._aggregate('info', category):
+                super().log_info(message, *args, **kwargs)
+
+        def log_warning(self, message, *args, category=None, **kwargs):
+            super().log_warning(message, *args, **kwargs)
+
+        def log_failure(self, message, *args, category=None, **kwargs):
+            super().log_failure(message, *args, **kwargs)
+
+        def log_summary(self):
+            counters = getattr(self, 'log_counters', None)
+            if not counters:
+                return
+            for category in sorted({category for category, _ in counters}):
+                total = counters[(category, 'success')] + counters[(category, 'info')]
+                hidden = total - self.log_sampled[category]
+                details = f"{counters[(category, 'success')]} success, {counters[(category, 'info')]} info"
+                if hidden:
+                    details += f", {hidden} messages not shown"
+                super().log_info(f"Summary for {category}: {details}")
+            del self.log_counters
+
+
+    def ttl_cache(seconds):
+        """Caches the results of a function per argument tuple for the given number of seconds."""
+        def decorator(func):
+            cache = {}
+
+            @functools.wraps(func)
+            def wrapper(*args):
+                now = time.monotonic()
+                if args not in cache or now - cache[args][0] > seconds:
+                    cache[args] = (now, func(*args))
+                return cache[args][1]
+            return wrapper
+        return decorator
+
+
+    class LazyChoiceVar(ChoiceVar):
+        """ChoiceVar whose choices are loaded when the form is built instead of when the module is imported."""
+
+        def __init__(self, choices_loader, *args, **kwargs):
+            super().__init__((), *args, **kwargs)
+            self.choices_loader = choices_loader
+
+        def as_field(self):
+            self.field_attrs['choices'] = ((None, '---------'),) + tuple(self.choices_loader())
+            return super().as_field()
+
+
+    @ttl_cache(60)
+    def custom_field_choices(name):
+        try:
+            return CustomFieldChoiceSet.objects.get(name=name).choices
+        except CustomFieldChoiceSet.DoesNotExist:
+            return []
+
+
+    class L2VPNsBulkImport(SummaryLogMixin, Script):
         class Meta:
             name = "Bulk import L2VPNs"
             description = "Create or update L2VPNs based on YAML input"
 
-            field_order = ['yamlfile']
+            field_order = ['yamlfile', 'log_verbosity']
 
         yamlfile = FileVar(
             description="Upload YAML file for the setup",
         )
 
-        def process_l2vpn(self, l2vpn_data, commit):
+        def process_l2vpn(self, l2vpn_data):
 
             # Check for Location existence
             if 'location' in l2vpn_data:
@@ -99,10 +312,10 @@ if not is_migrating:
             # Ensure Tenant exists or create it
             tenant = None
             if l2vpn_data.get('tenant'):
-                tenant, _ = Tenant.objects.get_or_create(name=l2vpn_data['tenant'], defaults={'slug': slugify(Tenant, l2vpn_data['tenant'])})
+                tenant, _ = Tenant.objects.get_or_create(name=l2vpn_data['tenant'], defaults={'slug': self.slugs.lazy(Tenant, l2vpn_data['tenant'])})
 
             # Ensure L2VPN exists or create it
-            defaults = {'slug': slugify(L2VPN, l2vpn_data['name']), 'type': 'vpls', 'identifier': l2vpn_data['identifier']}
+            defaults = {'slug': self.slugs.lazy(L2VPN, l2vpn_data['name']), 'type': 'vpls', 'identifier': l2vpn_data['identifier']}
             l2vpn, created = L2VPN.objects.get_or_create(
                 name=l2vpn_data['name'],
                 defaults=defaults
@@ -113,27 +326,26 @@ if not is_migrating:
                         setattr(l2vpn, k, v)
             action = "Created" if created else "Updated"
 
-            self.log_success(f"{action} L2VPN '{l2vpn.name}' with identifier '{l2vpn_data['identifier']}'")
+            self.log_success(f"{action} L2VPN '{l2vpn.name}' with identifier '{l2vpn_data['identifier']}'", category='l2vpn')
 
             # Process RouteTargets
             import_rt, _ = RouteTarget.objects.get_or_create(name=l2vpn_data['import_target'])
             export_rt, _ = RouteTarget.objects.get_or_create(name=l2vpn_data['export_target'])
-            if commit:
-                l2vpn.import_targets.add(import_rt)
-                l2vpn.export_targets.add(export_rt)
-            self.log_info(f"Associated import/export RouteTargets with L2VPN '{l2vpn.name}'")
+            l2vpn.import_targets.add(import_rt)
+            l2vpn.export_targets.add(export_rt)
+            self.log_info(f"Associated import/export RouteTargets with L2VPN '{l2vpn.name}'", category='route target')
 
             # VLAN
             l2vpn.custom_field_data['L2vpn_vlan'] = str(l2vpn_data['vlan']) if l2vpn_data['vlan'] > 0 else "untagged"
-            self.log_info(f"Set VLAN '{l2vpn_data['vlan']}' for L2VPN '{l2vpn.name}'")
+            self.log_info(f"Set VLAN '{l2vpn_data['vlan']}' for L2VPN '{l2vpn.name}'", category='l2vpn')
 
             if location_pk:
                 l2vpn.custom_field_data['Service_location'] = location_pk
-                self.log_info(f"Set location '{location.name}' for L2VPN '{l2vpn.name}'")
+                self.log_info(f"Set location '{location.name}' for L2VPN '{l2vpn.name}'", category='l2vpn')
 
             if tenant:
                 l2vpn.tenant = tenant
-                self.log_info(f"Set tenant '{tenant.name}' for L2VPN '{l2vpn.name}'")
+                self.log_info(f"Set tenant '{tenant.name}' for L2VPN '{l2vpn.name}'", category='l2vpn')
 
             # Commissioning_state
             if 'commissioning_state' in l2vpn_data:
@@ -144,70 +356,218 @@ if not is_migrating:
                 vrf, vrf_created = VRF.objects.get_or_create(name=l2vpn_data['ipvrf'])
                 l2vpn.custom_field_data['L2vpn_ipvrf'] = vrf.pk
                 vrf_action = "Created" if vrf_created else "Found"
-                self.log_info(f"{vrf_action} VRF '{vrf.name}' for L2VPN '{l2vpn.name}'")
+                self.log_info(f"{vrf_action} VRF '{vrf.name}' for L2VPN '{l2vpn.name}'", category='l2vpn')
 
             # IPVRF Gateway IP Address
             if l2vpn_data.get('ipvrf_gateway'):
                 ip_address, ip_created = IPAddress.objects.get_or_create(address=l2vpn_data['ipvrf_gateway'])
                 l2vpn.custom_field_data['L2vpn_gateway'] = ip_address.pk
                 ip_action = "Created" if ip_created else "Found"
-                self.log_info(f"{ip_action} IP address '{ip_address.address}' for L2VPN '{l2vpn.name}'")
+                self.log_info(f"{ip_action} IP address '{ip_address.address}' for L2VPN '{l2vpn.name}'", category='ip address')
 
-            if commit:
-                l2vpn.save()
-                self.log_info(f"Saved custom field updates for L2VPN '{l2vpn.name}'")
+            l2vpn.save()
+            self.log_info(f"Saved custom field updates for L2VPN '{l2vpn.name}'", category='l2vpn')
 
             # Process devices and their interfaces
             tag_name = f"l2vpn:{l2vpn.name}"
-            itf_tag, created = Tag.objects.get_or_create(name=tag_name, defaults={'slug': slugify(Tag, tag_name)})
+            itf_tag, created = Tag.objects.get_or_create(name=tag_name, defaults={'slug': self.slugs.lazy(Tag, tag_name)})
             if created:
-                self.log_success(f"Created new tag '{tag_name}' for interfaces associated with L2VPN '{l2vpn.name}'.")
+                self.log_success(f"Created new tag '{tag_name}' for interfaces associated with L2VPN '{l2vpn.name}'.", category='tag')
             else:
-                self.log_info(f"Found existing tag '{tag_name}' for interfaces associated with L2VPN '{l2vpn.name}'.")
+                self.log_info(f"Found existing tag '{tag_name}' for interfaces associated with L2VPN '{l2vpn.name}'.", category='tag')
 
-            # Tag interfaces listed in data
+            # Resolve the interfaces listed in data from the index of the whole file;
+            # unresolved names are reported together once the file is processed
+            wanted = {}
             for device_entry in l2vpn_data.get('devices', []):
-                device_name = device_entry['device_name']
-                try:
-                    device = Device.objects.get(name=device_name)
-                except Device.DoesNotExist:
-                    self.log_failure(f"Device '{device_name}' not found. Cannot associate interfaces for L2VPN '{l2vpn.name}'.")
-                    continue  # Skip to the next device_entry
-
                 for interface_name in device_entry.get('interfaces', []):
-                    try:
-                        interface = Interface.objects.get(name=interface_name, device=device)
-                        interface.tags.add(itf_tag)
-                        interface.save()
-
-                        self.log_info(f"Tagged interface '{interface_name}' on device '{device_name}' with L2VPN '{l2vpn.name}'.")
-                    except Interface.DoesNotExist:
-                        self.log_failure(f"Interface '{interface_name}' on device '{device_name}' not found. Cannot complete association for L2VPN '{l2vpn.name}'.")
-
-            # Remove tag from interfaces not listed in data
-            device_iface_map = {entry['device_name']: entry.get('interfaces', []) for entry in l2vpn_data.get('devices', []) if 'device_name' in entry}
-            for iface in Interface.objects.filter(tags=itf_tag):
-                if iface.device.name in device_iface_map:
-                    if iface.name not in device_iface_map[iface.device.name]:
-                        iface.tags.remove(itf_tag)
-                        iface.save()
-                        self.log_warning(f"Disassociating '{iface.device.name} {iface.name}' from L2VPN '{l2vpn.name}'.")
+                    key = (device_entry['device_name'], interface_name)
+                    if key in self.interface_index:
+                        wanted[key] = self.interface_index[key]
+
+            # Reconcile the tag as a set difference between the wanted and the currently tagged interfaces,
+            # applied with one bulk insert and one bulk delete on the tag through table
+            interface_type = ContentType.objects.get_for_model(Interface)
+            tagged = {
+                (device_name, interface_name): pk
+                for pk, device_name, interface_name in Interface.objects.filter(tags=itf_tag).values_list('pk', 'device__name', 'name')
+            }
+            to_tag = sorted(wanted.keys() - tagged.keys())
+            to_untag = sorted(tagged.keys() - wanted.keys())
+
+            TaggedItem.objects.bulk_create([
+                TaggedItem(tag=itf_tag, content_type=interface_type, object_id=wanted[key]) for key in to_tag
+            ])
+            for device_name, interface_name in to_tag:
+                self.log_info(f"Tagged interface '{interface_name}' on device '{device_name}' with L2VPN '{l2vpn.name}'.", category='tag')
+
+            if to_untag:
+                TaggedItem.objects.filter(tag=itf_tag, content_type=interface_type, object_id__in=[tagged[key] for key in to_untag]).delete()
+            for device_name, interface_name in to_untag:
+                self.log_warning(f"Disassociating '{device_name} {interface_name}' from L2VPN '{l2vpn.name}'.")
+
+            # Record the retagged interfaces as updated in the changelog and search cache
+            retagged = [wanted[key] for key in to_tag] + [tagged[key] for key in to_untag]
+            if retagged:
+                record_bulk_changes(Interface.objects.filter(pk__in=retagged), ObjectChangeActionChoices.ACTION_UPDATE)
+
+        def plan(self, l2vpns_data):
+            """
+            Computes the changes the import would make from one snapshot read of the referenced
+            locations, tenants, L2VPNs, route targets, VRFs, IPs, tags and interfaces.
+            Nothing is written to the database.
+            """
+            plan = ChangePlan()
+
+            locations = {location.name: location for location in Location.objects.filter(name__in={l2vpn_data['location'] for l2vpn_data in l2vpns_data if 'location' in l2vpn_data})}
+            tenants = {tenant.name: tenant for tenant in Tenant.objects.filter(name__in={l2vpn_data['tenant'] for l2vpn_data in l2vpns_data if l2vpn_data.get('tenant')})}
+            l2vpns = {l2vpn.name: l2vpn for l2vpn in L2VPN.objects.filter(name__in={l2vpn_data['name'] for l2vpn_data in l2vpns_data}).prefetch_related('import_targets', 'export_targets')}
+            rt_names = {l2vpn_data['import_target'] for l2vpn_data in l2vpns_data} | {l2vpn_data['export_target'] for l2vpn_data in l2vpns_data}
+            route_targets = set(RouteTarget.objects.filter(name__in=rt_names).values_list('name', flat=True))
+            vrfs = {vrf.name: vrf for vrf in VRF.objects.filter(name__in={l2vpn_data['ipvrf'] for l2vpn_data in l2vpns_data if l2vpn_data.get('ipvrf')})}
+            gateways = {
+                str(ip_address.address): ip_address
+                for ip_address in IPAddress.objects.filter(address__in={l2vpn_data['ipvrf_gateway'] for l2vpn_data in l2vpns_data if l2vpn_data.get('ipvrf_gateway')})
+            }
+            tag_names = {f"l2vpn:{l2vpn_data['name']}" for l2vpn_data in l2vpns_data}
+            tags = set(Tag.objects.filter(name__in=tag_names).values_list('name', flat=True))
+            tagged_interfaces = defaultdict(set)
+            for tag_name, device_name, interface_name in Interface.objects.filter(tags__name__in=tag_names).values_list('tags__name', 'device__name', 'name'):
+                tagged_interfaces[tag_name].add((device_name, interface_name))
+            device_names = {device_entry['device_name'] for l2vpn_data in l2vpns_data for device_entry in l2vpn_data.get('devices', [])}
+            existing_devices = set(Device.objects.filter(name__in=device_names).values_list('name', flat=True))
+            existing_interfaces = set(Interface.objects.filter(device__name__in=device_names).values_list('device__name', 'name'))
+
+            planned_tenants = set()
+            planned_route_targets = set()
+            planned_vrfs = set()
+            for l2vpn_data in l2vpns_data:
+                name = l2vpn_data['name']
+                if 'location' in l2vpn_data and l2vpn_data['location'] not in locations:
+                    plan.error(f"Location '{l2vpn_data['location']}' not found. Cannot create/update L2VPN '{name}' without a valid location.")
+                    continue
+
+                tenant_name = l2vpn_data.get('tenant')
+                if tenant_name and tenant_name not in tenants and tenant_name not in planned_tenants:
+                    planned_tenants.add(tenant_name)
+                    plan.create(Tenant, tenant_name)
+
+                custom_fields = {'L2vpn_vlan': str(l2vpn_data['vlan']) if l2vpn_data['vlan'] > 0 else "untagged"}
+                if 'location' in l2vpn_data:
+                    custom_fields['Service_location'] = locations[l2vpn_data['location']].pk
+                if 'commissioning_state' in l2vpn_data:
+                    custom_fields['Commissioning_state'] = l2vpn_data['commissioning_state']
+                if l2vpn_data.get('ipvrf'):
+                    vrf = vrfs.get(l2vpn_data['ipvrf'])
+                    if vrf is None and l2vpn_data['ipvrf'] not in planned_vrfs:
+                        planned_vrfs.add(l2vpn_data['ipvrf'])
+                        plan.create(VRF, l2vpn_data['ipvrf'])
+                    custom_fields['L2vpn_ipvrf'] = vrf.pk if vrf else l2vpn_data['ipvrf']
+                if l2vpn_data.get('ipvrf_gateway'):
+                    gateway = gateways.get(l2vpn_data['ipvrf_gateway'])
+                    if gateway is None:
+                        plan.create(IPAddress, l2vpn_data['ipvrf_gateway'])
+                    custom_fields['L2vpn_gateway'] = gateway.pk if gateway else l2vpn_data['ipvrf_gateway']
+
+                for rt_name in (l2vpn_data['import_target'], l2vpn_data['export_target']):
+                    if rt_name not in route_targets and rt_name not in planned_route_targets:
+                        planned_route_targets.add(rt_name)
+                        plan.create(RouteTarget, rt_name)
+
+                l2vpn = l2vpns.get(name)
+                if l2vpn is None:
+                    plan.create(
+                        L2VPN, name, type='vpls', identifier=l2vpn_data['identifier'], tenant=tenant_name,
+                        import_targets=l2vpn_data['import_target'], export_targets=l2vpn_data['export_target'], **custom_fields
+                    )
                 else:
-                    iface.tags.remove(itf_tag)
-                    iface.save()
-                    self.log_warning(f"Disassociating '{iface.device.name} {iface.name}' from L2VPN '{l2vpn.name}'.")
+                    l2vpn_changes = changed_fields(l2vpn, type='vpls', identifier=l2vpn_data['identifier'])
+                    if tenant_name and (l2vpn.tenant_id is None or tenants.get(tenant_name) is None or l2vpn.tenant_id != tenants[tenant_name].pk):
+                        l2vpn_changes['tenant'] = tenant_name
+                    if l2vpn_data['import_target'] not in {rt.name for rt in l2vpn.import_targets.all()}:
+                        l2vpn_changes['import_targets'] = f"+{l2vpn_data['import_target']}"
+                    if l2vpn_data['export_target'] not in {rt.name for rt in l2vpn.export_targets.all()}:
+                        l2vpn_changes['export_targets'] = f"+{l2vpn_data['export_target']}"
+                    l2vpn_changes.update({key: value for key, value in custom_fields.items() if l2vpn.custom_field_data.get(key) != value})
+                    plan.update(L2VPN, name, **l2vpn_changes)
+
+                # Interface tags are reconciled as a set difference between wanted and tagged interfaces
+                tag_name = f"l2vpn:{name}"
+                if tag_name not in tags:
+                    plan.create(Tag, tag_name)
+                wanted = set()
+                for device_entry in l2vpn_data.get('devices', []):
+                    device_name = device_entry['device_name']
+                    if device_name not in existing_devices:
+                        plan.error(f"Device '{device_name}' not found. Cannot associate interfaces for L2VPN '{name}'.")
+                        continue
+                    for interface_name in device_entry.get('interfaces', []):
+                        if (device_name, interface_name) in existing_interfaces:
+                            wanted.add((device_name, interface_name))
+                        else:
+                            plan.error(f"Interface '{interface_name}' on device '{device_name}' not found. Cannot complete association for L2VPN '{name}'.")
+                for device_name, interface_name in sorted(wanted - tagged_interfaces[tag_name]):
+                    plan.update(Interface, f"{device_name}:{interface_name}", tags=f"+{tag_name}")
+                for device_name, interface_name in sorted(tagged_interfaces[tag_name] - wanted):
+                    plan.update(Interface, f"{device_name}:{interface_name}", tags=f"-{tag_name}")
+
+            return plan
+
+        def index_interfaces(self, l2vpns_data):
+            """
+            Resolves every device and interface referenced anywhere in the file with one query each.
+            Returns the (device name, interface name) -> interface pk index and the unresolved names.
+            """
+            references = set()
+            device_names = set()
+            for l2vpn_data in l2vpns_data:
+                for device_entry in l2vpn_data.get('devices', []):
+                    device_names.add(device_entry['device_name'])
+                    references.update((device_entry['device_name'], interface_name) for interface_name in device_entry.get('interfaces', []))
+
+            existing_devices = set(Device.objects.filter(name__in=device_names).values_list('name', flat=True))
+            interface_index = {
+                (device_name, interface_name): pk
+                for pk, device_name, interface_name in Interface.objects.filter(
+                    device__name__in=existing_devices,
+                    name__in={interface_name for _, interface_name in references},
+                ).values_list('pk', 'device__name', 'name')
+            }
+
+            unresolved = [f"device '{device_name}'" for device_name in sorted(device_names - existing_devices)]
+            unresolved += [
+                f"interface '{interface_name}' on device '{device_name}'"
+                for device_name, interface_name in sorted(references)
+                if device_name in existing_devices and (device_name, interface_name) not in interface_index
+            ]
+            return interface_index, unresolved
 
         # Method to parse YAML input
         def parse_yaml(self, yaml_input):
             return yaml.safe_load(yaml_input)
 
         # Main method to run the script
+        @summarised_log
         def run(self, data, commit):
             # Assuming 'data' contains the YAML content
             yaml_content = self.parse_yaml(data['yamlfile'].read().decode('utf-8'))
 
+            # Dry runs only compute and report the plan, without any writes to roll back
+            if not commit:
+                plan = self.plan(yaml_content['l2vpns'])
+                plan.log(self)
+                return f"Planned changes: {plan.summary()}"
+
+            # Slugs for new tenants, L2VPNs and tags are reserved in memory for the whole file
+            self.slugs = SlugReservations()
+
+            # Devices and interfaces of all L2VPNs are resolved once for the whole file
+            self.interface_index, unresolved = self.index_interfaces(yaml_content['l2vpns'])
             for l2vpn_data in yaml_content['l2vpns']:
-                self.process_l2vpn(l2vpn_data, commit)
+                self.process_l2vpn(l2vpn_data)
+
+            if unresolved:
+                self.log_failure(f"{len(unresolved)} referenced objects not found, their L2VPN associations were skipped: {', '.join(unresolved)}")
 
 
     class CreateL2VPN(Script):
@@ -226,6 +586,8 @@ if not is_migrating:
         ipvrf_gateway = IPAddressWithMaskVar(description="Gateway Address", required=False)
 
         def run(self, data, commit):
+            self.slugs = SlugReservations()
+
             # Extract form data
             mac_vrf_id = data['mac_vrf_id']
             description = data.get('description', '')
@@ -244,7 +606,7 @@ if not is_migrating:
             mac_vrf_name = f"{django_slugify(location.name)}-macvrf-{mac_vrf_id}"
 
             # Create or update L2VPN instance
-            defaults = {'slug': slugify(L2VPN, mac_vrf_name), 'type': 'vpls', 'identifier': mac_vrf_id, 'description': description}
+            defaults = {'slug': self.slugs.lazy(L2VPN, mac_vrf_name), 'type': 'vpls', 'identifier': mac_vrf_id, 'description': description}
             l2vpn, created = L2VPN.objects.get_or_create(
                 name=mac_vrf_name,
                 defaults=defaults
@@ -289,7 +651,7 @@ if not is_migrating:
 
             # Tag and process interfaces
             tag_name = f"l2vpn:{l2vpn.name}"
-            interface_tag, _ = Tag.objects.get_or_create(name=tag_name, defaults={'slug': slugify(Tag, tag_name)})
+            interface_tag, _ = Tag.objects.get_or_create(name=tag_name, defaults={'slug': self.slugs.lazy(Tag, tag_name)})
             for interface in interfaces:
                 # Assume a tag is created for each L2VPN to associate interfaces
                 interface.tags.add(interface_tag)
@@ -368,15 +730,15 @@ if not is_migrating:
             return "L2VPN deletion process complete."
 
 
-    class VRFsBulkImport(Script):
+    class VRFsBulkImport(SummaryLogMixin, Script):
         class Meta:
             name = "Bulk import VRFs"
             description = "Create or update VRFs based on YAML input"
-            field_order = ['yamlfile']
+            field_order = ['yamlfile', 'log_verbosity']
 
         yamlfile = FileVar(description="Upload YAML file for the setup")
 
-        def process_vrf(self, vrf_data, commit):
+        def process_vrf(self, vrf_data):
             # Check and get location if specified
             location = None
             if vrf_data['location']:
@@ -386,10 +748,19 @@ if not is_migrating:
                     self.log_failure(f"Location '{vrf_data['location']}' not found. Cannot proceed with VRF '{vrf_data['name']}'")
                     return
 
+            # Check the WAN VRF before anything is written, so a VRF with a missing WAN VRF is skipped entirely
+            wan_vrf = None
+            if vrf_data.get('wan_vrf'):
+                try:
+                    wan_vrf = VRF.objects.get(name=vrf_data['wan_vrf'])
+                except VRF.DoesNotExist:
+                    self.log_failure(f"WAN VRF '{vrf_data['wan_vrf']}' not found. Cannot set WAN VRF for '{vrf_data['name']}'")
+                    return
+
             # Ensure Tenant exists or create it
             tenant = None
             if vrf_data['tenant']:
-                tenant, _ = Tenant.objects.get_or_create(name=vrf_data['tenant'], defaults={'slug': slugify(Tenant, vrf_data['tenant'])})
+                tenant, _ = Tenant.objects.get_or_create(name=vrf_data['tenant'], defaults={'slug': self.slugs.lazy(Tenant, vrf_data['tenant'])})
 
             # Ensure VRF exists or create it, including RD if specified
             defaults = {
@@ -400,19 +771,17 @@ if not is_migrating:
                 defaults=defaults
             )
             action = "Created" if created else "Updated"
-            self.log_success(f"{action} VRF '{vrf.name}' with Identfier '{vrf_data.get('identifier', '')}'")
+            self.log_success(f"{action} VRF '{vrf.name}' with Identfier '{vrf_data.get('identifier', '')}'", category='vrf')
 
             # Process RouteTargets
             if vrf_data['import_target']:
                 import_rt, _ = RouteTarget.objects.get_or_create(name=vrf_data['import_target'])
-                if commit:
-                    vrf.import_targets.add(import_rt)
+                vrf.import_targets.add(import_rt)
             if vrf_data['export_target']:
                 export_rt, _ = RouteTarget.objects.get_or_create(name=vrf_data['export_target'])
-                if commit:
-                    vrf.export_targets.add(export_rt)
+                vrf.export_targets.add(export_rt)
 
-            self.log_info(f"Updated import/export RouteTargets for VRF '{vrf.name}'")
+            self.log_info(f"Updated import/export RouteTargets for VRF '{vrf.name}'", category='route target')
 
             # Handle custom fields and relations
 
@@ -426,27 +795,99 @@ if not is_migrating:
             if 'commissioning_state' in vrf_data:
                 vrf.custom_field_data['Commissioning_state'] = vrf_data['commissioning_state']
 
-            if vrf_data.get('wan_vrf'):
-                try:
-                    wan_vrf = VRF.objects.get(name=vrf_data['wan_vrf'])
-                    # Assuming 'Vrf_wanvrf' is the field name for WAN VRF relation in your custom fields
-                    vrf.custom_field_data['Vrf_wanvrf'] = wan_vrf.pk
-                except VRF.DoesNotExist:
-                    self.log_failure(f"WAN VRF '{vrf_data['wan_vrf']}' not found. Cannot set WAN VRF for '{vrf_data['name']}'")
-                    return
+            if wan_vrf:
+                # Assuming 'Vrf_wanvrf' is the field name for WAN VRF relation in your custom fields
+                vrf.custom_field_data['Vrf_wanvrf'] = wan_vrf.pk
 
-            if commit:
-                vrf.save()
-                self.log_info(f"Saved updates for VRF '{vrf.name}'")
+            vrf.save()
+            self.log_info(f"Saved updates for VRF '{vrf.name}'", category='vrf')
+
+        def plan(self, vrfs_data):
+            """
+            Computes the changes the import would make from one snapshot read of the referenced
+            locations, tenants, VRFs and route targets. Nothing is written to the database.
+            """
+            plan = ChangePlan()
+
+            locations = {location.name: location for location in Location.objects.filter(name__in={vrf_data['location'] for vrf_data in vrfs_data if vrf_data['location']})}
+            tenants = set(Tenant.objects.filter(name__in={vrf_data['tenant'] for vrf_data in vrfs_data if vrf_data['tenant']}).values_list('name', flat=True))
+            vrf_names = {vrf_data['name'] for vrf_data in vrfs_data} | {vrf_data['wan_vrf'] for vrf_data in vrfs_data if vrf_data.get('wan_vrf')}
+            vrfs = {vrf.name: vrf for vrf in VRF.objects.filter(name__in=vrf_names).select_related('tenant').prefetch_related('import_targets', 'export_targets')}
+            rt_names = {vrf_data[key] for vrf_data in vrfs_data for key in ('import_target', 'export_target') if vrf_data[key]}
+            route_targets = set(RouteTarget.objects.filter(name__in=rt_names).values_list('name', flat=True))
+
+            planned_tenants = set()
+            planned_route_targets = set()
+            planned_vrfs = set()
+            for vrf_data in vrfs_data:
+                name = vrf_data['name']
+                if vrf_data['location'] and vrf_data['location'] not in locations:
+                    plan.error(f"Location '{vrf_data['location']}' not found. Cannot proceed with VRF '{name}'")
+                    continue
+                if vrf_data.get('wan_vrf') and vrf_data['wan_vrf'] not in vrfs and vrf_data['wan_vrf'] not in planned_vrfs:
+                    plan.error(f"WAN VRF '{vrf_data['wan_vrf']}' not found. Cannot set WAN VRF for '{name}'")
+                    continue
+
+                tenant_name = vrf_data['tenant']
+                if tenant_name and tenant_name not in tenants and tenant_name not in planned_tenants:
+                    planned_tenants.add(tenant_name)
+                    plan.create(Tenant, tenant_name)
+
+                for key in ('import_target', 'export_target'):
+                    rt_name = vrf_data[key]
+                    if rt_name and rt_name not in route_targets and rt_name not in planned_route_targets:
+                        planned_route_targets.add(rt_name)
+                        plan.create(RouteTarget, rt_name)
+
+                custom_fields = {}
+                if vrf_data['identifier']:
+                    custom_fields['Vrf_identifier'] = vrf_data['identifier']
+                if vrf_data['location']:
+                    custom_fields['Service_location'] = locations[vrf_data['location']].pk
+                if 'commissioning_state' in vrf_data:
+                    custom_fields['Commissioning_state'] = vrf_data['commissioning_state']
+                if vrf_data.get('wan_vrf'):
+                    wan_vrf = vrfs.get(vrf_data['wan_vrf'])
+                    custom_fields['Vrf_wanvrf'] = wan_vrf.pk if wan_vrf else vrf_data['wan_vrf']
+
+                vrf = vrfs.get(name)
+                if vrf is None:
+                    planned_vrfs.add(name)
+                    plan.create(
+                        VRF, name, tenant=tenant_name,
+                        import_targets=vrf_data['import_target'], export_targets=vrf_data['export_target'], **custom_fields
+                    )
+                else:
+                    vrf_changes = {}
+                    # Tenants are compared by name, so a tenant this plan creates also counts as a change
+                    if (tenant_name or None) != (vrf.tenant.name if vrf.tenant else None):
+                        vrf_changes['tenant'] = tenant_name
+                    if vrf_data['import_target'] and vrf_data['import_target'] not in {rt.name for rt in vrf.import_targets.all()}:
+                        vrf_changes['import_targets'] = f"+{vrf_data['import_target']}"
+                    if vrf_data['export_target'] and vrf_data['export_target'] not in {rt.name for rt in vrf.export_targets.all()}:
+                        vrf_changes['export_targets'] = f"+{vrf_data['export_target']}"
+                    vrf_changes.update({key: value for key, value in custom_fields.items() if vrf.custom_field_data.get(key) != value})
+                    plan.update(VRF, name, **vrf_changes)
+
+            return plan
 
         def parse_yaml(self, yaml_input):
             return yaml.safe_load(yaml_input)
 
+        @summarised_log
         def run(self, data, commit):
             yaml_content = self.parse_yaml(data['yamlfile'].read().decode('utf-8'))
 
+            # Dry runs only compute and report the plan, without any writes to roll back
+            if not commit:
+                plan = self.plan(yaml_content['vrfs'])
+                plan.log(self)
+                return f"Planned changes: {plan.summary()}"
+
+            # Slugs for new tenants are reserved in memory for the whole file
+            self.slugs = SlugReservations()
             for vrf_data in yaml_content['vrfs']:
-                self.process_vrf(vrf_data, commit)
+                self.process_vrf(vrf_data)
 
 
     class CreateVRF(Script):
@@ -647,7 +1088,7 @@ if not is_migrating:
 
         # Define input fields for the script
         tenant = ObjectVar(model=Tenant, description="Tenant", query_params={"name__isw": "svc:"})
-        commissioning_state = ChoiceVar(choices=commissioning_state_choices)
+        commissioning_state = LazyChoiceVar(functools.partial(custom_field_choices, "Service_commissioning_state"))
 
         def run(self, data, commit):
             tenant = data['tenant']